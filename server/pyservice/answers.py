@@ -0,0 +1,189 @@
+import argparse
+import sys
+import threading
+import time
+from itertools import combinations, product
+from pathlib import Path
+
+import numpy as np
+
+from artifacts import ARTIFACTS_DIR
+
+# Precomputed model answers for sparse inputs. Most patients mark only two or
+# three symptoms, so every vector with at most k non-zero severities (1-3) is
+# scored offline and stored sorted by a packed key: two bits per symptom in
+# symptom_columns order. Requests that match are answered with one binary
+# search per batch; anything else falls through to live inference.
+#
+#   python server/pyservice/answers.py build --max-symptoms 3
+#   python server/pyservice/answers.py status
+
+ANSWERS_FILE = Path("answers") / "answers.npz"
+
+# Single symptoms take the fallback path and never reach the models
+MIN_SYMPTOMS = 2
+SEVERITIES = (1, 2, 3)
+
+
+def sparse_rows(n_columns, size):
+    """All int8 rows with exactly `size` non-zero severities."""
+    columns = np.array(list(combinations(range(n_columns), size)), dtype=np.intp)
+    severities = np.array(list(product(SEVERITIES, repeat=size)), dtype=np.int8)
+    rows = np.zeros((len(columns) * len(severities), n_columns), dtype=np.int8)
+    row_index = np.arange(len(rows))[:, None]
+    rows[row_index, np.repeat(columns, len(severities), axis=0)] = np.tile(severities, (len(columns), 1))
+    return rows
+
+
+def pack_keys(rows):
+    shifts = np.arange(rows.shape[1], dtype=np.uint64) * np.uint64(2)
+    return np.bitwise_or.reduce(rows.astype(np.uint64) << shifts, axis=1)
+
+
+def build_answers(artifacts, max_symptoms=3, chunk_rows=16384, artifacts_dir=ARTIFACTS_DIR):
+    """Score every sparse vector with the stored models and write the table.
+
+    Returns the number of rows written.
+    """
+    from ensemble import TriagePredictor
+
+    symptom_columns = artifacts["symptom_columns"]
+    if len(symptom_columns) > 32:
+        raise ValueError(f"{len(symptom_columns)} symptoms do not fit a 64-bit key")
+    # The stored models themselves, not the compiled traversal
+    predictor = TriagePredictor(artifacts["models"], artifacts["model_columns"])
+
+    keys, categories, scores, remedies = [], [], [], []
+    for size in range(MIN_SYMPTOMS, max_symptoms + 1):
+        rows = sparse_rows(len(symptom_columns), size)
+        for start in range(0, len(rows), chunk_rows):
+            chunk = rows[start:start + chunk_rows]
+            category, score, remedy = predictor.predict(chunk)
+            keys.append(pack_keys(chunk))
+            categories.append(category)
+            scores.append(np.asarray(score, dtype=np.float64))
+            remedies.append(np.asarray(remedy))
+
+    keys = np.concatenate(keys)
+    order = np.argsort(keys, kind="stable")
+    remedy_names, remedy_codes = np.unique(np.concatenate(remedies).astype(str), return_inverse=True)
+
+    path = Path(artifacts_dir) / ANSWERS_FILE
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.stem + ".tmp.npz")
+    np.savez(
+        tmp_path,
+        keys=keys[order],
+        categories=np.concatenate(categories)[order],
+        scores=np.concatenate(scores)[order],
+        remedy_codes=remedy_codes.astype(np.uint16)[order],
+        remedies=remedy_names,
+        symptom_columns=np.array(symptom_columns, dtype=str),
+        model_version=np.array(artifacts["model_version"]),
+        max_symptoms=np.array(max_symptoms),
+    )
+    tmp_path.replace(path)
+    return len(keys)
+
+
+class AnswerTable:
+    """Sorted packed keys with the model outputs for each.
+
+    lookup() answers only for the model version the table was built from, so
+    after a hot reload it misses until the table is rebuilt.
+    """
+
+    def __init__(self, data):
+        self.keys = data["keys"]
+        self.categories = data["categories"]
+        self.scores = data["scores"]
+        self.remedy_codes = data["remedy_codes"]
+        self.remedies = data["remedies"].tolist()
+        self.symptom_columns = data["symptom_columns"].tolist()
+        self.model_version = str(data["model_version"])
+        self.max_symptoms = int(data["max_symptoms"])
+        self.shifts = {name: 2 * i for i, name in enumerate(self.symptom_columns)}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def lookup(self, rows, version):
+        """One (category, score, remedy) per row of a severity matrix, as the
+        models would return them, or None where the table has no answer.
+
+        Rows must hold validated severities 0-3; a row with more than
+        max_symptoms non-zero entries simply has no key in the table.
+        """
+        if version != self.model_version or not len(self.keys):
+            found = [False] * len(rows)
+            positions = [0] * len(rows)
+        else:
+            keys = pack_keys(rows)
+            positions = np.minimum(self.keys.searchsorted(keys), len(self.keys) - 1)
+            found = (self.keys[positions] == keys).tolist()
+            positions = positions.tolist()
+        with self._lock:
+            hits = sum(found)
+            self.hits += hits
+            self.misses += len(found) - hits
+        return [
+            (self.categories[i], self.scores[i], self.remedies[self.remedy_codes[i]]) if hit else None
+            for i, hit in zip(positions, found)
+        ]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "rows": len(self.keys),
+                "max_symptoms": self.max_symptoms,
+                "model_version": self.model_version,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def load_answer_table(symptom_columns, artifacts_dir=ARTIFACTS_DIR):
+    """The table under artifacts_dir, or None if there is none or it was
+    built for different symptom columns."""
+    path = Path(artifacts_dir) / ANSWERS_FILE
+    if not path.exists():
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            table = AnswerTable(data)
+    except Exception as e:
+        print(f"Answer table not used (unreadable: {e})", file=sys.stderr)
+        return None
+    if table.symptom_columns != list(symptom_columns):
+        print("Answer table not used (built for different symptom columns)", file=sys.stderr)
+        return None
+    return table
+
+
+if __name__ == "__main__":
+    from artifacts import load_artifacts, load_raw_artifacts
+
+    parser = argparse.ArgumentParser(description="Build or check the precomputed answer table")
+    parser.add_argument("command", choices=["build", "status"])
+    parser.add_argument("--artifacts-dir", default=str(ARTIFACTS_DIR))
+    parser.add_argument("--max-symptoms", type=int, default=3,
+                        help="largest number of non-zero symptoms to enumerate (build only)")
+    args = parser.parse_args()
+
+    # The bundle holds compiled trees; the table is built from the stored models
+    load = load_raw_artifacts if args.command == "build" else load_artifacts
+    artifacts = load(args.artifacts_dir)
+    if args.command == "build":
+        started = time.perf_counter()
+        rows = build_answers(artifacts, args.max_symptoms, artifacts_dir=args.artifacts_dir)
+        print(f"Built {rows} answers for model {artifacts['model_version']} "
+              f"in {time.perf_counter() - started:.1f}s: {Path(args.artifacts_dir) / ANSWERS_FILE}")
+    else:
+        table = load_answer_table(artifacts["symptom_columns"], args.artifacts_dir)
+        if table is None:
+            print("missing: no usable answer table")
+            sys.exit(1)
+        current = table.model_version == artifacts["model_version"]
+        print(f"{'fresh' if current else 'stale'}: {len(table.keys)} answers, up to {table.max_symptoms} "
+              f"symptoms, model {table.model_version}")
+        sys.exit(0 if current else 1)
@@ -0,0 +1,363 @@
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+from ensemble import FLAT_ARRAYS, CompiledModel, TriagePredictor
+from lookups import build_composition_index, build_dosage_index, build_fallback_index
+
+# Loading of datasets and models shared by main.py and both predict.py
+# variants. A compiled bundle (see build_bundle) is used when it is present
+# and up to date; otherwise everything is read from the raw files. The bundle
+# holds the models as flat tree arrays (ensemble.CompiledModel), so loading
+# it imports neither scikit-learn, joblib nor pandas; those are only imported
+# for the raw files.
+
+ARTIFACTS_DIR = Path(__file__).resolve().parent.parent.parent / "artifacts"
+
+LABEL_COLUMNS = ['SPID', 'Remedy', 'UrgencyScore', 'UrgencyCategory', 'UrgencyCategoryEncoded', 'Condition']
+
+# Bump when the bundle layout changes so old bundles are treated as stale
+BUNDLE_FORMAT = 3
+
+# Generic remedies for a single reported symptom. The table ships with the
+# code rather than under artifacts/, so its path is absolute.
+FALLBACK_FILE = Path(__file__).resolve().parent / "fallback_remedies.json"
+
+SOURCE_FILES = {
+    "training": Path("data") / "Balanced_SPID_Dataset.csv",
+    "composition": Path("data") / "Remedy_Composition_FINAL_Merged.csv",
+    "dosage": Path("data") / "Complete_Remedy_Dosage_Dataset.xls",
+    "clf_u": Path("model") / "balanced_urgency_classifier.pkl",
+    "reg": Path("model") / "urgency_gb_regressor.pkl",
+    "clf_r": Path("model") / "balanced_remedy_classifier.pkl",
+    "fallback": FALLBACK_FILE,
+}
+
+# The files a model release replaces; see registry.py
+MODEL_FILES = ("clf_u", "reg", "clf_r")
+
+# The manifest names the current bundle directory, bundle/<version>, which
+# holds lookups.pickle and per model either <name>.<array>.npy files or, for a
+# model that cannot be compiled, <name>.joblib
+BUNDLE_DIR = Path("bundle")
+MANIFEST_FILE = BUNDLE_DIR / "manifest.json"
+LOOKUPS_FILE = "lookups.pickle"
+
+# Models are fed plain arrays in their training column order (see
+# model_columns), so sklearn's feature-name check has nothing to add.
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+
+def read_symptom_columns(training_csv):
+    import pandas as pd
+
+    # Only the header is needed; the rows are training data
+    header = pd.read_csv(training_csv, nrows=0)
+    return header.drop(columns=LABEL_COLUMNS, errors='ignore').columns.tolist()
+
+
+def read_dosage(dosage_file):
+    import pandas as pd
+
+    # The "xls" sheet is exported as CSV; only try Excel if that does not parse
+    try:
+        dosage_df = pd.read_csv(dosage_file)
+        dosage_df.columns = [str(c).strip() for c in dosage_df.columns]
+        if 'Remedy' in dosage_df.columns:
+            return dosage_df
+    except Exception:
+        pass
+    try:
+        dosage_df = pd.read_excel(dosage_file)
+    except Exception:
+        return None
+    dosage_df.columns = [str(c).strip() for c in dosage_df.columns]
+    return dosage_df
+
+
+def read_fallback_remedies(path=FALLBACK_FILE):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def model_columns(model, symptom_columns):
+    """Column indexes that put a symptom_columns-ordered matrix into the
+    model's training column order, or None when the orders already match."""
+    names = getattr(model, "feature_names_in_", None)
+    if names is None or list(names) == list(symptom_columns):
+        return None
+    return np.array([symptom_columns.index(name) for name in names])
+
+
+def _with_model_columns(artifacts):
+    artifacts["model_columns"] = {
+        name: model_columns(model, artifacts["symptom_columns"])
+        for name, model in artifacts["models"].items()
+    }
+    return artifacts
+
+
+def load_models(artifacts_dir=ARTIFACTS_DIR):
+    import joblib
+
+    artifacts_dir = Path(artifacts_dir)
+    return {name: joblib.load(str(artifacts_dir / SOURCE_FILES[name])) for name in MODEL_FILES}
+
+
+def model_version(model_hashes):
+    """Short content version of the three model files, from their sha256s."""
+    return hashlib.sha256("".join(model_hashes[name] for name in MODEL_FILES).encode()).hexdigest()[:12]
+
+
+def model_files_version(artifacts_dir=ARTIFACTS_DIR):
+    artifacts_dir = Path(artifacts_dir)
+    return model_version({name: file_sha256(artifacts_dir / SOURCE_FILES[name]) for name in MODEL_FILES})
+
+
+def model_fingerprint(artifacts_dir=ARTIFACTS_DIR):
+    """Cheap stat-based change check for the model files; None if any is missing."""
+    try:
+        return tuple(tuple(_fingerprint(Path(artifacts_dir) / SOURCE_FILES[name]).values()) for name in MODEL_FILES)
+    except OSError:
+        return None
+
+
+def load_raw_artifacts(artifacts_dir=ARTIFACTS_DIR):
+    import pandas as pd
+
+    artifacts_dir = Path(artifacts_dir)
+    paths = {name: artifacts_dir / rel for name, rel in SOURCE_FILES.items()}
+    composition_df = pd.read_csv(paths["composition"])
+    dosage_df = read_dosage(paths["dosage"])
+    composition_index = build_composition_index(composition_df)
+    return _with_model_columns({
+        "version": None,
+        "model_version": model_files_version(artifacts_dir),
+        "source": "raw",
+        "symptom_columns": read_symptom_columns(paths["training"]),
+        "composition_index": composition_index,
+        "dosage_index": build_dosage_index(dosage_df),
+        "fallback_index": build_fallback_index(read_fallback_remedies(paths["fallback"]), composition_index),
+        "models": load_models(artifacts_dir),
+    })
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _fingerprint(path):
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _write_atomic(path, write):
+    # Written under a temporary name and renamed, so a process loading the
+    # bundle never maps a half-written file. The name is unique per writer:
+    # workers starting together may all re-stamp the manifest at once.
+    f = tempfile.NamedTemporaryFile(dir=path.parent, prefix=path.name + ".", suffix=".tmp", delete=False)
+    try:
+        with f:
+            write(f)
+        # NamedTemporaryFile creates 0600; the bundle is read by the service user
+        os.chmod(f.name, 0o644)
+        os.replace(f.name, path)
+    except BaseException:
+        if os.path.exists(f.name):
+            os.unlink(f.name)
+        raise
+
+
+def build_bundle(artifacts_dir=ARTIFACTS_DIR):
+    """Compile the raw datasets and models into one versioned bundle.
+
+    Returns the manifest that was written next to the bundle.
+    """
+    import joblib
+
+    artifacts_dir = Path(artifacts_dir)
+    artifacts = load_raw_artifacts(artifacts_dir)
+
+    sources = {}
+    for name, rel in SOURCE_FILES.items():
+        path = artifacts_dir / rel
+        sources[name] = {"path": rel.as_posix(), "sha256": file_sha256(path), **_fingerprint(path)}
+    version = hashlib.sha256(
+        "".join(sources[name]["sha256"] for name in sorted(sources)).encode()
+    ).hexdigest()[:12]
+
+    bundle_dir = artifacts_dir / BUNDLE_DIR / version
+    bundle_dir.mkdir(parents=True, exist_ok=True)
+    lookups = {
+        key: artifacts[key]
+        for key in ("symptom_columns", "composition_index", "dosage_index", "fallback_index")
+    }
+    _write_atomic(bundle_dir / LOOKUPS_FILE, lambda f: pickle.dump(lookups, f, protocol=pickle.HIGHEST_PROTOCOL))
+    files = [LOOKUPS_FILE]
+
+    # Compact compilation checks each model against the stored one on the
+    # parity probe; a model that does not compile or match is kept pickled
+    predictor = TriagePredictor(artifacts["models"], artifacts["model_columns"], compact=True)
+    models = {}
+    for name in MODEL_FILES:
+        compiled = predictor.compiled.get(name)
+        if compiled is None:
+            print(f"{name} cannot be compiled; bundling the scikit-learn model", file=sys.stderr)
+            _write_atomic(bundle_dir / f"{name}.joblib", lambda f: joblib.dump(artifacts["models"][name], f))
+            models[name] = {"pickle": f"{name}.joblib"}
+            files.append(f"{name}.joblib")
+            continue
+        for array_name, array in compiled.flat.arrays().items():
+            _write_atomic(bundle_dir / f"{name}.{array_name}.npy", lambda f: np.save(f, array))
+            files.append(f"{name}.{array_name}.npy")
+        models[name] = {"compiled": compiled.metadata()}
+
+    manifest = {
+        "format": BUNDLE_FORMAT,
+        "version": version,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "files": {name: file_sha256(bundle_dir / name) for name in files},
+        "models": models,
+        "sources": sources,
+    }
+    _write_manifest(artifacts_dir, manifest)
+
+    # Earlier versions and layouts; processes that still map their files
+    # keep them until they exit
+    for path in (artifacts_dir / BUNDLE_DIR).iterdir():
+        if path.is_dir() and path.name != version:
+            shutil.rmtree(path, ignore_errors=True)
+        elif path.suffix == ".joblib":
+            path.unlink()
+    return manifest
+
+
+def _write_manifest(artifacts_dir, manifest):
+    _write_atomic(Path(artifacts_dir) / MANIFEST_FILE, lambda f: f.write(json.dumps(manifest, indent=2).encode()))
+
+
+def read_manifest(artifacts_dir=ARTIFACTS_DIR):
+    try:
+        return json.loads((Path(artifacts_dir) / MANIFEST_FILE).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def bundle_status(artifacts_dir=ARTIFACTS_DIR, verify=False):
+    """Return (usable, reason). Staleness is checked with a stat per source;
+    a source whose stat changed (a fresh clone or copy) is re-hashed and
+    still counts as current if its content did not change. verify=True also
+    re-hashes the bundle files against their recorded checksums."""
+    artifacts_dir = Path(artifacts_dir)
+    manifest = read_manifest(artifacts_dir)
+    if manifest is None:
+        return False, "no bundle manifest"
+    if manifest.get("format") != BUNDLE_FORMAT:
+        return False, f"bundle format {manifest.get('format')} != {BUNDLE_FORMAT}"
+    bundle_dir = artifacts_dir / BUNDLE_DIR / manifest["version"]
+    if not all((bundle_dir / name).exists() for name in manifest["files"]):
+        return False, "bundle files missing"
+    restamped = False
+    for name, rel in SOURCE_FILES.items():
+        recorded = manifest["sources"].get(name)
+        path = artifacts_dir / rel
+        if recorded is None or not path.exists():
+            return False, f"source {rel.as_posix()} missing"
+        fingerprint = _fingerprint(path)
+        if fingerprint == {"size": recorded["size"], "mtime_ns": recorded["mtime_ns"]}:
+            continue
+        if fingerprint["size"] != recorded["size"] or file_sha256(path) != recorded["sha256"]:
+            return False, f"source {rel.as_posix()} changed since bundle was built"
+        recorded.update(fingerprint)
+        restamped = True
+    if restamped:
+        # Same content, new stat: record it so the next start is a stat again
+        try:
+            _write_manifest(artifacts_dir, manifest)
+        except OSError:
+            pass
+    if verify:
+        for name, sha256 in manifest["files"].items():
+            if file_sha256(bundle_dir / name) != sha256:
+                return False, f"bundle checksum mismatch ({name})"
+    return True, manifest["version"]
+
+
+def _load_bundled_model(bundle_dir, name, entry):
+    if "pickle" in entry:
+        import joblib
+
+        return joblib.load(str(bundle_dir / entry["pickle"]))
+    # Memory-mapped read-only: pages are shared between worker processes and
+    # read in as the trees are walked
+    arrays = {array_name: np.load(bundle_dir / f"{name}.{array_name}.npy", mmap_mode="r")
+              for array_name in FLAT_ARRAYS}
+    return CompiledModel.from_arrays(entry["compiled"], arrays)
+
+
+def load_bundle(artifacts_dir=ARTIFACTS_DIR):
+    artifacts_dir = Path(artifacts_dir)
+    manifest = read_manifest(artifacts_dir)
+    bundle_dir = artifacts_dir / BUNDLE_DIR / manifest["version"]
+    with open(bundle_dir / LOOKUPS_FILE, "rb") as f:
+        lookups = pickle.load(f)
+    sources = manifest["sources"]
+    return _with_model_columns({
+        "version": manifest["version"],
+        "model_version": model_version({name: sources[name]["sha256"] for name in MODEL_FILES}),
+        "source": "bundle",
+        "symptom_columns": lookups["symptom_columns"],
+        "composition_index": lookups["composition_index"],
+        "dosage_index": lookups["dosage_index"],
+        "fallback_index": lookups["fallback_index"],
+        "models": {name: _load_bundled_model(bundle_dir, name, manifest["models"][name]) for name in MODEL_FILES},
+    })
+
+
+def load_artifacts(artifacts_dir=ARTIFACTS_DIR):
+    """Load from the compiled bundle when it is fresh, else from raw files.
+
+    CAREMATE_ARTIFACT_BUNDLE=0 forces the raw files.
+    """
+    if os.environ.get("CAREMATE_ARTIFACT_BUNDLE", "1") == "0":
+        return load_raw_artifacts(artifacts_dir)
+    usable, reason = bundle_status(artifacts_dir)
+    if usable:
+        try:
+            return load_bundle(artifacts_dir)
+        except Exception as e:
+            reason = f"bundle unreadable: {e}"
+    if (Path(artifacts_dir) / MANIFEST_FILE).exists():
+        print(f"Artifact bundle not used ({reason}); loading raw files", file=sys.stderr)
+    return load_raw_artifacts(artifacts_dir)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or check the compiled artifact bundle")
+    parser.add_argument("command", choices=["build", "status"])
+    parser.add_argument("--artifacts-dir", default=str(ARTIFACTS_DIR))
+    parser.add_argument("--verify", action="store_true",
+                        help="also check the bundle checksum (status only)")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        manifest = build_bundle(args.artifacts_dir)
+        print(f"Built bundle {manifest['version']} in {Path(args.artifacts_dir) / BUNDLE_DIR / manifest['version']}")
+    else:
+        usable, reason = bundle_status(args.artifacts_dir, verify=args.verify)
+        print(f"{'fresh' if usable else 'stale'}: {reason}")
+        sys.exit(0 if usable else 1)
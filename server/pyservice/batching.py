@@ -0,0 +1,103 @@
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+from timings import NULL_TIMER, PhaseTimer
+
+# Concurrent single requests (HTTP threads, or pipelined worker requests) are
+# gathered into one predict_batch call so the three models run once per batch
+# instead of once per row.
+
+
+def _size_bucket(n):
+    # Power-of-two buckets: 1, 2-3, 4-7, 8-15, ...
+    low = 1 << (n.bit_length() - 1)
+    return str(low) if low == 1 else f"{low}-{2 * low - 1}"
+
+
+class MicroBatcher:
+    """Coalesces single predictions into batches of up to max_rows.
+
+    The first request of a batch waits at most max_wait_ms for others to
+    join. With max_wait_ms=0 nothing waits: a batch is whatever queued up
+    while the previous one was being scored, so a lone request pays no extra
+    latency. score_batch(inputs, timer) must return one result per input.
+    """
+
+    def __init__(self, score_batch, max_rows=64, max_wait_ms=0.0):
+        self.score_batch = score_batch
+        self.max_rows = max_rows
+        self.max_wait_ms = max_wait_ms
+        self.batches = 0
+        self.rows = 0
+        self.max_batch_size = 0
+        self.batch_sizes = Counter()
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, item, timings=False):
+        """Queue one input; returns a Future for its result."""
+        future = Future()
+        self._queue.put((item, timings, future, time.perf_counter()))
+        if self._thread is None:
+            # Started on first use so a process that forks after import (the
+            # HTTP server) gets the thread in each child, not the parent
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                    self._thread.start()
+        return future
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000
+        while len(batch) < self.max_rows:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            timer = PhaseTimer() if any(timings for _, timings, _, _ in batch) else NULL_TIMER
+            try:
+                results = self.score_batch([item for item, _, _, _ in batch], timer)
+            except Exception as e:
+                for _, _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            self._record(len(batch))
+            for (_, timings, future, queued), result in zip(batch, results):
+                if timings:
+                    result = result.with_timings(dict(
+                        timer.as_dict(),
+                        queue_wait=round((started - queued) * 1000, 3),
+                        batch_size=len(batch),
+                    ))
+                future.set_result(result)
+
+    def _record(self, size):
+        with self._lock:
+            self.batches += 1
+            self.rows += size
+            self.max_batch_size = max(self.max_batch_size, size)
+            self.batch_sizes[_size_bucket(size)] += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_rows": self.max_rows,
+                "max_wait_ms": self.max_wait_ms,
+                "batches": self.batches,
+                "rows": self.rows,
+                "mean_batch_size": round(self.rows / self.batches, 2) if self.batches else None,
+                "max_batch_size": self.max_batch_size,
+                "batch_sizes": dict(sorted(self.batch_sizes.items(), key=lambda kv: int(kv[0].split("-")[0]))),
+            }
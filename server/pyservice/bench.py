@@ -0,0 +1,276 @@
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Benchmark harness for the triage scoring path. Drives predict()/predict_batch()
+# in-process and the one-shot scripts as fresh processes, using synthetic
+# symptom vectors built from symptom_columns, and writes a JSON report that
+# can be compared against a previous run with --compare.
+
+HERE = Path(__file__).resolve().parent
+SCRIPTS = {
+    "predict.py": HERE / "predict.py",
+    "src/predict.py": HERE.parent / "src" / "pyservice" / "predict.py",
+}
+
+# Metric suffixes where a larger value is a regression; rows_per_s is the
+# other way round and everything else is informational
+LOWER_IS_BETTER = ("_ms", "_kb")
+
+
+def synthetic_inputs(symptom_columns, n, seed=0, max_symptoms=4):
+    """Request payloads with 2..max_symptoms symptoms at severity 1-3."""
+    rng = random.Random(seed)
+    genders = ["M", "F", "Other"]
+    inputs = []
+    for _ in range(n):
+        k = rng.randint(2, max_symptoms)
+        symptoms = {s: rng.randint(1, 3) for s in rng.sample(symptom_columns, k)}
+        inputs.append({"symptoms": symptoms, "age": rng.randint(1, 90), "gender": rng.choice(genders)})
+    return inputs
+
+
+def percentiles(samples_s):
+    ms = np.asarray(samples_s) * 1000
+    return {
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "mean_ms": float(ms.mean()),
+    }
+
+
+def run_child(script, payload):
+    """Run a one-shot script; return (stdout, stderr, returncode, peak RSS in KB).
+
+    The child is reaped with wait4 so its own ru_maxrss is read, rather than
+    RUSAGE_CHILDREN, which is the largest of every child so far.
+    """
+    with tempfile.TemporaryFile() as stderr:
+        proc = subprocess.Popen([sys.executable, str(script)], stdin=subprocess.PIPE,
+                                stdout=subprocess.PIPE, stderr=stderr)
+        # The scripts read all of stdin before writing anything
+        proc.stdin.write(json.dumps(payload).encode())
+        proc.stdin.close()
+        stdout = proc.stdout.read()
+        proc.stdout.close()
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        stderr.seek(0)
+        return stdout.decode(), stderr.read().decode(errors="replace"), proc.returncode, usage.ru_maxrss
+
+
+def bench_cold_start(script, payload, runs):
+    samples = []
+    peak_rss_kb = 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        stdout, stderr, returncode, rss_kb = run_child(script, payload)
+        samples.append(time.perf_counter() - start)
+        if returncode != 0 or '"error"' in stdout:
+            raise RuntimeError(f"{script} failed: {stdout or stderr}")
+        peak_rss_kb = max(peak_rss_kb, rss_kb)
+    result = percentiles(samples)
+    # Largest of this script's runs, in KB on Linux
+    result["peak_rss_kb"] = peak_rss_kb
+    return result
+
+
+def bench_warm_single(predict_module, inputs):
+    samples = []
+    for payload in inputs:
+        start = time.perf_counter()
+        predict_module.predict(payload)
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+
+def bench_batch(predict_module, inputs, sizes):
+    results = {}
+    for size in sizes:
+        batch = inputs[:size]
+        start = time.perf_counter()
+        predict_module.predict_batch(batch)
+        elapsed = time.perf_counter() - start
+        results[str(size)] = {"elapsed_ms": elapsed * 1000, "rows_per_s": len(batch) / elapsed}
+    return results
+
+
+def bench_phases(predict_module, inputs):
+    """Time each stage of the model path on its own, one row at a time."""
+    from ensemble import MODEL_NAMES
+    from lookups import lookup_composition, lookup_dosage
+
+    predictor = predict_module.predictor
+    columns = predict_module.symptom_columns
+    phases = {"build_matrix": [], "dosage_lookup": [], "composition_lookup": []}
+    # In low-memory mode compiled models replace the released originals
+    models = {name: predictor.models.get(name) or predictor.compiled[name] for name in MODEL_NAMES}
+    for name in models:
+        phases[f"predict_{name}"] = []
+
+    for payload in inputs:
+        start = time.perf_counter()
+        X = np.array([[payload["symptoms"].get(s, 0) for s in columns]])
+        X32 = np.ascontiguousarray(X, dtype=np.float32)
+        phases["build_matrix"].append(time.perf_counter() - start)
+
+        remedy = None
+        for name, model in models.items():
+            model_X = predictor._model_input(X32 if predictor.tree_models[name] else X, name, None)
+            start = time.perf_counter()
+            output = model.predict(model_X)
+            phases[f"predict_{name}"].append(time.perf_counter() - start)
+            if name == "clf_r":
+                remedy = output[0]
+
+        age_category = predict_module.get_age_category(payload["age"])
+        gender = payload["gender"].upper()
+        start = time.perf_counter()
+        lookup_dosage(predict_module.dosage_index, remedy, age_category, gender)
+        phases["dosage_lookup"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        lookup_composition(predict_module.composition_index, remedy)
+        phases["composition_lookup"].append(time.perf_counter() - start)
+
+    return {name: percentiles(samples) for name, samples in phases.items()}
+
+
+def run(args):
+    # Measure the models, not the result cache or the answer table (most
+    # synthetic inputs are sparse enough to be in it). Set before the cold
+    # runs so their processes inherit it too.
+    if not args.cache:
+        os.environ["CAREMATE_CACHE_SIZE"] = "0"
+    if not args.answers:
+        os.environ["CAREMATE_ANSWER_TABLE"] = "0"
+    sys.path.insert(0, str(HERE))
+
+    # Cold start runs first: a child's ru_maxrss starts from the parent's RSS
+    # at spawn time, so the parent must not have the models loaded yet
+    cold_start = {}
+    if args.cold_runs:
+        from artifacts import ARTIFACTS_DIR, LABEL_COLUMNS, SOURCE_FILES
+
+        with open(ARTIFACTS_DIR / SOURCE_FILES["training"], newline="") as f:
+            header = next(csv.reader(f))
+        columns = [c for c in header if c not in LABEL_COLUMNS]
+        payload = synthetic_inputs(columns, 1, seed=args.seed)[0]
+        cold_start = {name: bench_cold_start(script, payload, args.cold_runs) for name, script in SCRIPTS.items()}
+
+    start = time.perf_counter()
+    import predict
+    import_s = time.perf_counter() - start
+
+    inputs = synthetic_inputs(predict.symptom_columns, max(args.requests, max(args.batch_sizes)), seed=args.seed)
+    warm = inputs[:args.requests]
+    # Warm-up so first-call costs do not land in the percentiles
+    predict.predict_batch(warm[:10])
+    steady_rss_kb = predict.memory_stats()["rss_kb"]
+
+    from artifacts import load_artifacts
+    start = time.perf_counter()
+    load_artifacts()
+    load_s = time.perf_counter() - start
+
+    import sklearn
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "artifact_version": predict.artifacts["version"],
+            "artifact_source": predict.artifacts["source"],
+            "model_version": predict.registry.current.version,
+            "compiled_models": sorted(predict.predictor.compiled),
+            "low_memory": predict.LOW_MEMORY,
+            "cache": args.cache,
+            "answer_table": predict.answer_table is not None,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "sklearn": sklearn.__version__,
+            "requests": args.requests,
+            "seed": args.seed,
+        },
+        "startup": {"import_predict_ms": import_s * 1000, "artifact_load_ms": load_s * 1000},
+        "warm_single": bench_warm_single(predict, warm),
+        "throughput": bench_batch(predict, inputs, args.batch_sizes),
+        "phases": bench_phases(predict, warm),
+    }
+    if cold_start:
+        report["cold_start"] = cold_start
+    report["steady_rss_kb"] = steady_rss_kb
+    report["peak_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return report
+
+
+def _flatten(prefix, value, out):
+    if isinstance(value, dict):
+        for key, inner in value.items():
+            _flatten(f"{prefix}.{key}" if prefix else key, inner, out)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        out[prefix] = value
+    return out
+
+
+def compare(report, baseline, tolerance):
+    """Metrics that got worse than the baseline by more than tolerance."""
+    current = _flatten("", {k: v for k, v in report.items() if k != "meta"}, {})
+    previous = _flatten("", {k: v for k, v in baseline.items() if k != "meta"}, {})
+    regressions = []
+    for key, old in previous.items():
+        new = current.get(key)
+        if new is None or old <= 0:
+            continue
+        if key.endswith(LOWER_IS_BETTER):
+            worse = new > old * (1 + tolerance)
+        elif key.endswith("rows_per_s"):
+            worse = new < old * (1 - tolerance)
+        else:
+            continue
+        if worse:
+            regressions.append({"metric": key, "baseline": old, "current": new})
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the triage scoring pipeline")
+    parser.add_argument("--requests", type=int, default=500, help="warm single requests")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 16, 256, 4096])
+    parser.add_argument("--cold-runs", type=int, default=5, help="fresh processes per script (0 to skip)")
+    parser.add_argument("--cache", action="store_true", help="leave the result cache on")
+    parser.add_argument("--answers", action="store_true", help="leave the precomputed answer table on")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="baseline JSON report to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown")
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        for key in ("cache", "answer_table"):
+            if baseline.get("meta", {}).get(key) != report["meta"][key]:
+                print(f"warning: {key} is {report['meta'][key]} here but "
+                      f"{baseline.get('meta', {}).get(key)} in the baseline", file=sys.stderr)
+        report["regressions"] = compare(report, baseline, args.tolerance)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text)
+    else:
+        print(text)
+    if report.get("regressions"):
+        for r in report["regressions"]:
+            print(f"regression: {r['metric']} {r['baseline']:.3f} -> {r['current']:.3f}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,82 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# Cold-start benchmark: how long a fresh `predict.py` process takes to import,
+# load artifacts and answer its first request, with the compiled bundle and
+# with the raw CSV/pickle files. Each run also records whether pandas and
+# scikit-learn were imported; from the bundle, neither should be.
+
+HERE = Path(__file__).resolve().parent
+
+CHILD = """
+import json, sys, time
+t0 = time.perf_counter()
+import predict
+t1 = time.perf_counter()
+cols = predict.symptom_columns
+result = predict.predict({"symptoms": {cols[0]: 2, cols[1]: 1}, "age": 30, "gender": "M"})
+t2 = time.perf_counter()
+print(json.dumps({
+    "import_s": t1 - t0,
+    "first_predict_s": t2 - t1,
+    "artifact_source": predict.artifacts["source"],
+    "pandas_loaded": "pandas" in sys.modules,
+    "sklearn_loaded": "sklearn" in sys.modules,
+    "error": result.error,
+}))
+"""
+
+MODES = {
+    "bundle": {"CAREMATE_ARTIFACT_BUNDLE": "1"},
+    "raw": {"CAREMATE_ARTIFACT_BUNDLE": "0"},
+}
+
+
+def run_once(mode):
+    env = dict(os.environ, **MODES[mode])
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", CHILD], cwd=HERE, env=env,
+                          capture_output=True, text=True, check=True)
+    sample = json.loads(proc.stdout.strip().splitlines()[-1])
+    sample["process_s"] = time.perf_counter() - start
+    return sample
+
+
+def summarize(samples):
+    summary = {"runs": len(samples)}
+    for key in ("process_s", "import_s", "first_predict_s"):
+        values = [s[key] for s in samples]
+        summary[key] = {"median": statistics.median(values), "min": min(values)}
+    summary["artifact_source"] = samples[-1]["artifact_source"]
+    summary["pandas_loaded"] = samples[-1]["pandas_loaded"]
+    summary["sklearn_loaded"] = samples[-1]["sklearn_loaded"]
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare predict.py cold start from the bundle and the raw files")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    report = {mode: summarize([run_once(mode) for _ in range(args.runs)]) for mode in args.modes}
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{'mode':<8} {'source':<8} {'pandas':<7} {'sklearn':<8} {'process':>9} {'import':>9} {'1st req':>9}")
+        for mode, r in report.items():
+            print(f"{mode:<8} {r['artifact_source']:<8} {str(r['pandas_loaded']):<7} {str(r['sklearn_loaded']):<8} "
+                  f"{r['process_s']['median'] * 1000:>7.0f}ms {r['import_s']['median'] * 1000:>7.0f}ms "
+                  f"{r['first_predict_s']['median'] * 1000:>7.1f}ms")
+        if any(r["pandas_loaded"] or r["sklearn_loaded"]
+               for r in report.values() if r["artifact_source"] == "bundle"):
+            print("note: the bundle path imported pandas or scikit-learn; a model that cannot be compiled "
+                  "is bundled as a scikit-learn pickle (see artifacts.build_bundle)")
@@ -0,0 +1,205 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from itertools import islice
+
+from records import ErrorResult
+from serialization import dumps, loads
+
+# Streaming bulk scoring: patient records from a JSONL or CSV file (or stdin)
+# are scored in fixed-size chunks through predict_batch() and written out as
+# JSON lines as each chunk finishes, so memory stays flat however large the
+# input is. Every output line carries its input record offset; --resume uses
+# the last complete line to pick up where an interrupted run stopped.
+
+# CSV columns that describe the patient rather than a symptom
+CSV_FIELDS = {"id", "spid", "age", "gender"}
+
+predict = None
+
+
+def jsonl_lines(f):
+    for line in f:
+        line = line.strip()
+        if line:
+            yield line
+
+
+def parse_jsonl(line):
+    return loads(line)
+
+
+def parse_csv(row):
+    """A wide CSV row (one column per symptom, blank or 0 when absent)."""
+    symptoms = {}
+    for name, value in row.items():
+        if name in CSV_FIELDS or value is None or not value.strip():
+            continue
+        severity = float(value)
+        symptoms[name] = int(severity) if severity.is_integer() else severity
+    age = float(row["age"]) if row.get("age") else None
+    if age is not None and age.is_integer():
+        age = int(age)
+    record = {"symptoms": symptoms, "age": age, "gender": row.get("gender")}
+    for field in ("id", "spid"):
+        if row.get(field):
+            record[field] = row[field]
+    return record
+
+
+def open_input(path, fmt):
+    f = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+    if fmt == "csv":
+        return f, csv.DictReader(f), parse_csv
+    return f, jsonl_lines(f), parse_jsonl
+
+
+def _last_newline(f, before, block_size=1 << 16):
+    """Position of the last newline before `before`, or -1. Reads backwards
+    a block at a time, so memory does not grow with the file."""
+    end = before
+    while end > 0:
+        start = max(0, end - block_size)
+        f.seek(start)
+        index = f.read(end - start).rfind(b"\n")
+        if index >= 0:
+            return start + index
+        end = start
+    return -1
+
+
+def resume_offset(path, default=0):
+    """Input offset after the last complete line of an earlier output file.
+
+    A line torn by the interruption is cut off so appending starts clean.
+    """
+    if not os.path.exists(path):
+        return default
+    with open(path, "r+b") as f:
+        size = f.seek(0, os.SEEK_END)
+        end = _last_newline(f, size) + 1
+        if end < size:
+            f.truncate(end)
+        if end == 0:
+            return default
+        start = _last_newline(f, end - 1) + 1
+        f.seek(start)
+        last = f.read(end - start)
+    return json.loads(last)["offset"] + 1
+
+
+def score_chunk(raw_records, parse, offset):
+    inputs = []
+    parse_errors = {}
+    for i, raw in enumerate(raw_records):
+        try:
+            record = parse(raw)
+        except (ValueError, TypeError) as e:
+            # Keep the slot so output lines stay aligned with input records
+            parse_errors[i] = ErrorResult(f"Invalid record: {e}")
+            record = {}
+        inputs.append(record)
+
+    to_score = [r for i, r in enumerate(inputs) if i not in parse_errors]
+    scored = iter(predict.predict_batch(to_score))
+    lines = []
+    errors = 0
+    for i, record in enumerate(inputs):
+        result = parse_errors.get(i) or next(scored)
+        errors += result.error is not None
+        row = {"offset": offset + i, "result": result}
+        for field in ("id", "spid", "_id"):
+            if isinstance(record, dict) and field in record:
+                row[field] = record[field]
+        lines.append(dumps(row) + "\n")
+    return "".join(lines), errors
+
+
+class Progress:
+    def __init__(self, start_offset, every_s):
+        self.start_offset = start_offset
+        self.every_s = every_s
+        self.records = 0
+        self.errors = 0
+        self.started = self._last_report = time.perf_counter()
+
+    def update(self, records, errors):
+        self.records += records
+        self.errors += errors
+        now = time.perf_counter()
+        if self.every_s and now - self._last_report >= self.every_s:
+            self._last_report = now
+            print(f"scored {self.records} records ({self.start_offset + self.records} total, "
+                  f"{self.errors} errors) at {self.rate():.0f}/s", file=sys.stderr, flush=True)
+
+    def rate(self):
+        elapsed = time.perf_counter() - self.started
+        return self.records / elapsed if elapsed else 0.0
+
+    def summary(self):
+        return {
+            "records": self.records,
+            "errors": self.errors,
+            "start_offset": self.start_offset,
+            "next_offset": self.start_offset + self.records,
+            "seconds": round(time.perf_counter() - self.started, 3),
+            "records_per_s": round(self.rate(), 1),
+        }
+
+
+def run(args):
+    start = args.start
+    if args.resume:
+        if args.output == "-":
+            raise SystemExit("--resume needs an --output file")
+        start = resume_offset(args.output, args.start)
+    fmt = args.format or ("csv" if args.input.endswith(".csv") else "jsonl")
+
+    f, records, parse = open_input(args.input, fmt)
+    records = islice(records, start, None)
+    if args.output == "-":
+        out = sys.stdout
+    else:
+        out = open(args.output, "a" if args.resume else "w", encoding="utf-8")
+    progress = Progress(start, args.progress_every)
+    offset = start
+    try:
+        while True:
+            chunk = list(islice(records, args.chunk_size))
+            if not chunk:
+                break
+            text, errors = score_chunk(chunk, parse, offset)
+            out.write(text)
+            # A flushed chunk is what --resume counts as done
+            out.flush()
+            offset += len(chunk)
+            progress.update(len(chunk), errors)
+    except KeyboardInterrupt:
+        print(f"interrupted; rerun with --resume to continue from offset {offset}", file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if f is not sys.stdin:
+            f.close()
+    return progress.summary()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a JSONL or CSV file of patient records in chunks")
+    parser.add_argument("input", help="JSONL or CSV file ('-' for stdin)")
+    parser.add_argument("-o", "--output", default="-", help="JSONL output file (default stdout)")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="default: from the file extension, else jsonl")
+    parser.add_argument("--chunk-size", type=int, default=1024, help="records per predict_batch call")
+    parser.add_argument("--start", type=int, default=0, help="skip this many input records")
+    parser.add_argument("--resume", action="store_true",
+                        help="append to --output, starting after its last complete line")
+    parser.add_argument("--progress-every", type=float, default=5.0,
+                        help="seconds between progress lines on stderr (0 = off)")
+    args = parser.parse_args()
+
+    import predict
+
+    print(json.dumps(run(args)), file=sys.stderr)
@@ -0,0 +1,88 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+def cache_key(row, age_category, gender):
+    """Compact key for a symptom_columns-ordered severity row.
+
+    Severities 0-3 pack into one byte each; rows with anything else
+    (floats, out-of-range values) are not cached and get None.
+    """
+    try:
+        packed = bytes(row)
+    except (TypeError, ValueError):
+        return None
+    if max(packed, default=0) > 3:
+        return None
+    return (packed, age_category, gender)
+
+
+class PredictionCache:
+    """Thread-safe LRU cache of finished prediction results with optional TTL.
+
+    Entries belong to one artifact version; set_version() with a different
+    version drops everything. Cached results are shared between callers and
+    must not be mutated.
+    """
+
+    def __init__(self, maxsize=4096, ttl=None, version=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        if key is None or self.maxsize <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                result, stored_at = entry
+                if self.ttl is None or time.monotonic() - stored_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return result
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, result, version=None):
+        # A result computed on a model set that has since been swapped out
+        # must not land in the new version's cache
+        if key is None or self.maxsize <= 0:
+            return
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            self._entries[key] = (result, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def set_version(self, version):
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self.version = version
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "version": self.version,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
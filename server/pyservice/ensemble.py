@@ -0,0 +1,368 @@
+import argparse
+import sys
+
+import numpy as np
+
+from timings import NULL_TIMER
+
+# The urgency classifier, urgency regressor and remedy classifier all score
+# the same rows. TriagePredictor converts a batch once and runs all three;
+# tree ensembles can optionally be compiled into flat arrays and traversed
+# with NumPy instead of going through scikit-learn's per-call machinery.
+# Compact compilation stores those arrays in small dtypes so the scikit-learn
+# trees can be dropped (low-memory mode). Compact models can also be saved as
+# plain arrays and rebuilt without scikit-learn (the artifact bundle).
+
+MODEL_NAMES = ("clf_u", "reg", "clf_r")
+
+# The node arrays of FlatTrees, as stored in the artifact bundle
+FLAT_ARRAYS = ("roots", "feature", "threshold", "left", "right", "is_leaf", "values")
+
+
+def _is_tree_model(model):
+    # Tree-based estimators cast inputs to float32 themselves, so converting
+    # once up front gives bit-identical results
+    estimators = getattr(model, "estimators_", None)
+    if hasattr(model, "tree_"):
+        return True
+    if estimators is None:
+        return False
+    first = np.asarray(estimators, dtype=object).ravel()[0]
+    return hasattr(first, "tree_")
+
+
+def _float32_floor(values):
+    """Largest float32 <= each value. For a float32 x, x <= t holds exactly
+    when x <= _float32_floor(t), so split decisions do not change."""
+    rounded = values.astype(np.float32)
+    above = rounded.astype(np.float64) > values
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+
+class FlatTrees:
+    """All trees of an ensemble concatenated into flat node arrays.
+
+    compact=True stores features as int16 (when they fit), children as int32
+    and thresholds as float32 (rounded down, which is exact for float32 inputs).
+    """
+
+    def __init__(self, trees, leaf_values, compact=False):
+        offsets = np.cumsum([0] + [t.node_count for t in trees[:-1]])
+        index_dtype = np.int32 if compact else np.intp
+        self.roots = offsets.astype(np.intp)
+        self.feature = np.concatenate([t.feature for t in trees])
+        small = compact and self.feature.max(initial=0) <= np.iinfo(np.int16).max
+        self.feature = self.feature.astype(np.int16 if small else np.intp)
+        self.threshold = np.concatenate([t.threshold for t in trees])
+        if compact:
+            self.threshold = _float32_floor(self.threshold)
+        self.left = np.concatenate([t.children_left + off for t, off in zip(trees, offsets)]).astype(index_dtype)
+        self.right = np.concatenate([t.children_right + off for t, off in zip(trees, offsets)]).astype(index_dtype)
+        self.is_leaf = np.concatenate([t.children_left == -1 for t in trees])
+        self.values = np.concatenate(leaf_values)
+        self.depth = max(t.max_depth for t in trees)
+
+    @classmethod
+    def from_arrays(cls, arrays, depth):
+        """Rebuild from arrays(), e.g. memory-mapped .npy files."""
+        flat = cls.__new__(cls)
+        for name in FLAT_ARRAYS:
+            setattr(flat, name, arrays[name])
+        flat.depth = depth
+        return flat
+
+    def arrays(self):
+        return {name: getattr(self, name) for name in FLAT_ARRAYS}
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in self.arrays().values())
+
+    def apply(self, X):
+        """Leaf node per (row, tree), shape (n_rows, n_trees)."""
+        nodes = np.broadcast_to(self.roots, (X.shape[0], len(self.roots))).copy()
+        rows = np.arange(X.shape[0])[:, None]
+        for _ in range(self.depth):
+            leaf = self.is_leaf[nodes]
+            if leaf.all():
+                break
+            # Leaves carry feature -2; they are masked out below
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(leaf, nodes, np.where(go_left, self.left[nodes], self.right[nodes]))
+        return nodes
+
+
+def _classifier_leaf_values(tree, n_classes):
+    values = tree.value[:, 0, :n_classes]
+    totals = values.sum(axis=1, keepdims=True)
+    if np.allclose(totals[totals > 0], 1.0):
+        return values
+    # Older scikit-learn stores class counts and normalises at predict time
+    totals[totals == 0.0] = 1.0
+    return values / totals
+
+
+class CompiledModel:
+    """Array-based replacement for model.predict on a float32 matrix.
+
+    A compact model keeps no reference to the scikit-learn model; metadata()
+    and flat.arrays() then hold all of it, and from_arrays() rebuilds it
+    without importing scikit-learn. Classifier leaf probabilities can be
+    stored as leaf_dtype (e.g. float32); regressor leaves stay float64 so
+    scores are bit-identical.
+    """
+
+    def __init__(self, model, compact=False, leaf_dtype=np.float64):
+        from sklearn.dummy import DummyRegressor
+        from sklearn.ensemble import GradientBoostingRegressor
+        from sklearn.ensemble._forest import ForestClassifier, ForestRegressor
+
+        self.model = None if compact else model
+        # Named as on scikit-learn models, which callers may hold instead
+        self.n_features_in_ = int(model.n_features_in_)
+        self.feature_names_in_ = getattr(model, "feature_names_in_", None)
+        if isinstance(model, ForestClassifier) and model.n_outputs_ == 1:
+            self.kind = "forest_classifier"
+            self.classes = model.classes_
+            trees = [e.tree_ for e in model.estimators_]
+            leaf_values = [_classifier_leaf_values(t, model.n_classes_).astype(leaf_dtype) for t in trees]
+        elif isinstance(model, ForestRegressor) and model.n_outputs_ == 1:
+            self.kind = "forest_regressor"
+            trees = [e.tree_ for e in model.estimators_]
+            leaf_values = [t.value[:, 0, 0] for t in trees]
+        elif isinstance(model, GradientBoostingRegressor):
+            self.kind = "gb_regressor"
+            self.learning_rate = model.learning_rate
+            if compact:
+                # Without the model, only a constant initial prediction works
+                if not (model.init_ == "zero" or isinstance(model.init_, DummyRegressor)):
+                    raise TypeError(f"cannot compact {type(model.init_).__name__} init")
+                self.init_value = model._raw_predict_init(np.zeros((1, self.n_features_in_), np.float32))[0, 0]
+            trees = [e.tree_ for e in model.estimators_[:, 0]]
+            leaf_values = [t.value[:, 0, 0] for t in trees]
+        else:
+            raise TypeError(f"cannot compile {type(model).__name__}")
+        self.flat = FlatTrees(trees, leaf_values, compact=compact)
+
+    def metadata(self):
+        """Everything but the node arrays, as JSON-compatible values."""
+        if self.model is not None:
+            raise ValueError("only compact models can be saved")
+        meta = {
+            "kind": self.kind,
+            "n_features": self.n_features_in_,
+            "feature_names": None if self.feature_names_in_ is None else list(self.feature_names_in_),
+            "depth": self.flat.depth,
+        }
+        if self.kind == "forest_classifier":
+            meta["classes"] = self.classes.tolist()
+            meta["classes_dtype"] = self.classes.dtype.str
+        elif self.kind == "gb_regressor":
+            meta["learning_rate"] = float(self.learning_rate)
+            meta["init_value"] = float(self.init_value)
+        return meta
+
+    @classmethod
+    def from_arrays(cls, meta, arrays):
+        """Rebuild a compact model from metadata() and flat.arrays()."""
+        compiled = cls.__new__(cls)
+        compiled.model = None
+        compiled.kind = meta["kind"]
+        compiled.n_features_in_ = meta["n_features"]
+        names = meta["feature_names"]
+        compiled.feature_names_in_ = None if names is None else np.array(names, dtype=object)
+        if compiled.kind == "forest_classifier":
+            compiled.classes = np.array(meta["classes"], dtype=meta["classes_dtype"])
+        elif compiled.kind == "gb_regressor":
+            compiled.learning_rate = meta["learning_rate"]
+            compiled.init_value = np.float64(meta["init_value"])
+        compiled.flat = FlatTrees.from_arrays(arrays, meta["depth"])
+        return compiled
+
+    def predict(self, X):
+        # Callers outside TriagePredictor (main.py) may pass a DataFrame
+        X32 = np.ascontiguousarray(X, dtype=np.float32)
+        leaves = self.flat.apply(X32)
+        values = self.flat.values[leaves]
+        n_trees = leaves.shape[1]
+        # Accumulate tree by tree in the same order as scikit-learn so the
+        # floating-point sums are identical
+        if self.kind == "forest_classifier":
+            proba = np.zeros((X32.shape[0], values.shape[2]))
+            for t in range(n_trees):
+                proba += values[:, t]
+            proba /= n_trees
+            return self.classes.take(np.argmax(proba, axis=1), axis=0)
+        if self.kind == "forest_regressor":
+            out = np.zeros(X32.shape[0])
+            for t in range(n_trees):
+                out += values[:, t]
+            out /= n_trees
+            return out
+        if self.model is None:
+            raw = np.full(X32.shape[0], self.init_value)
+        else:
+            raw = self.model._raw_predict_init(X32)[:, 0].copy()
+        scale = self.learning_rate
+        for t in range(n_trees):
+            raw += scale * values[:, t]
+        return raw
+
+
+class TriagePredictor:
+    """Urgency class, urgency score and remedy for a batch in one call.
+
+    X is an (n_rows, n_symptoms) matrix in symptom_columns order. It is
+    converted once and reordered per model only where a model's training
+    column order differs (see artifacts.model_columns).
+
+    Compiled trees win on small batches, where scikit-learn's per-call
+    overhead dominates; batches above compiled_max_rows go to scikit-learn.
+
+    compact=True compiles with small dtypes and then drops the scikit-learn
+    models that compiled, so every batch uses the compiled trees and only
+    uncompilable models stay in `models`. shrink_leaves also tries float32
+    classifier probabilities, kept only where predictions still match.
+
+    `models` may already hold CompiledModels (loaded from the artifact
+    bundle); those are used for every batch, as there is nothing to fall
+    back to.
+    """
+
+    def __init__(self, models, model_columns, compile_trees=False, compiled_max_rows=256,
+                 compact=False, shrink_leaves=False):
+        self.models = dict(models)
+        self.model_columns = model_columns
+        self.compiled_max_rows = compiled_max_rows
+        self.n_features = int(models["clf_u"].n_features_in_)
+        self.tree_models = {
+            name: isinstance(models[name], CompiledModel) or _is_tree_model(models[name]) for name in MODEL_NAMES
+        }
+        self.compiled = {
+            name: self.models.pop(name) for name in MODEL_NAMES if isinstance(models[name], CompiledModel)
+        }
+        if compile_trees or compact:
+            self.compile(compact=compact, shrink_leaves=shrink_leaves)
+        if compact:
+            for name in self.compiled:
+                self.models.pop(name, None)
+            self.compiled_max_rows = None
+
+    def compile(self, probe=None, compact=False, shrink_leaves=False):
+        """Compile tree ensembles; keep only those that pass a parity check."""
+        if probe is None:
+            probe = parity_probe(self.n_features)
+        leaf_dtypes = (np.float32, np.float64) if shrink_leaves else (np.float64,)
+        for name in MODEL_NAMES:
+            if name in self.compiled:
+                continue
+            X = self._model_input(probe, name, np.float32)
+            expected = None
+            for leaf_dtype in leaf_dtypes:
+                try:
+                    compiled = CompiledModel(self.models[name], compact=compact, leaf_dtype=leaf_dtype)
+                except TypeError:
+                    break
+                if expected is None:
+                    expected = self.models[name].predict(X)
+                if np.array_equal(compiled.predict(X), expected):
+                    self.compiled[name] = compiled
+                    break
+                if leaf_dtype is not np.float64:
+                    print(f"Compiled {name} with {np.dtype(leaf_dtype).name} leaves does not match; "
+                          f"keeping float64", file=sys.stderr)
+                else:
+                    print(f"Compiled {name} does not match the original model; using scikit-learn",
+                          file=sys.stderr)
+        return sorted(self.compiled)
+
+    @property
+    def remedies(self):
+        """The remedies clf_r can predict."""
+        compiled = self.compiled.get("clf_r")
+        return compiled.classes if compiled is not None else self.models["clf_r"].classes_
+
+    def model_bytes(self):
+        """Array bytes held per compiled model (uncompiled models are not counted)."""
+        return {name: compiled.flat.nbytes for name, compiled in self.compiled.items()}
+
+    def _model_input(self, X, name, dtype):
+        columns = self.model_columns.get(name)
+        if columns is not None:
+            X = X[:, columns]
+        return np.ascontiguousarray(X, dtype=dtype) if dtype is not None else X
+
+    def predict(self, X, timer=NULL_TIMER):
+        X = np.asarray(X)
+        X32 = np.ascontiguousarray(X, dtype=np.float32)
+        use_compiled = self.compiled_max_rows is None or len(X) <= self.compiled_max_rows
+        timer.lap("model_input")
+        outputs = []
+        for name in MODEL_NAMES:
+            if self.tree_models[name]:
+                model_X = X32 if self.model_columns.get(name) is None else self._model_input(X32, name, None)
+            else:
+                model_X = self._model_input(X, name, None)
+            model = self.models.get(name)
+            if name in self.compiled and (use_compiled or model is None):
+                model = self.compiled[name]
+            outputs.append(model.predict(model_X))
+            timer.lap(f"model_{name}")
+        return tuple(outputs)
+
+
+def parity_probe(n_features, n_random=512, seed=0):
+    """Every single symptom at each severity plus random sparse vectors,
+    all with severities 0-3."""
+    rows = []
+    for i in range(n_features):
+        for severity in (1, 2, 3):
+            row = np.zeros(n_features)
+            row[i] = severity
+            rows.append(row)
+    rng = np.random.default_rng(seed)
+    dense = rng.integers(0, 4, size=(n_random, n_features))
+    mask = rng.random((n_random, n_features)) < 0.25
+    rows.extend(dense * mask)
+    return np.array(rows, dtype=np.float64)
+
+
+def parity_report(predictor, X):
+    """Number of rows where the predictor disagrees with the stored models.
+
+    X is scored in batches of at most compiled_max_rows, so compiled models
+    are the ones checked however large the probe is.
+    """
+    step = predictor.compiled_max_rows or len(X)
+    batches = [predictor.predict(X[start:start + step]) for start in range(0, len(X), step)]
+    got = [np.concatenate(outputs) for outputs in zip(*batches)]
+    report = {}
+    for name, values in zip(MODEL_NAMES, got):
+        if name not in predictor.models:
+            # Dropped after compact compilation, which checked it already
+            continue
+        expected = predictor.models[name].predict(predictor._model_input(X, name, None))
+        report[name] = int(np.sum(np.asarray(values) != np.asarray(expected)))
+    return report
+
+
+if __name__ == "__main__":
+    # The stored scikit-learn models, not the compiled trees of the bundle
+    from artifacts import load_raw_artifacts
+
+    parser = argparse.ArgumentParser(description="Check TriagePredictor against the stored models")
+    parser.add_argument("--compile", action="store_true", help="also compile tree ensembles")
+    parser.add_argument("--rows", type=int, default=2048, help="random probe rows")
+    args = parser.parse_args()
+
+    artifacts = load_raw_artifacts()
+    predictor = TriagePredictor(artifacts["models"], artifacts["model_columns"], compile_trees=args.compile)
+    if args.compile:
+        print(f"compiled: {', '.join(sorted(predictor.compiled)) or 'none'}")
+    probe = parity_probe(len(artifacts["symptom_columns"]), n_random=args.rows, seed=1)
+    report = parity_report(predictor, probe)
+    for name, mismatches in report.items():
+        path = "compiled" if name in predictor.compiled else "scikit-learn"
+        print(f"{name} ({path}): {mismatches} mismatches over {len(probe)} rows")
+    sys.exit(1 if any(report.values()) else 0)
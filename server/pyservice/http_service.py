@@ -0,0 +1,171 @@
+import os
+import signal
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from serialization import dumps_bytes, loads
+
+# HTTP front end for predict.py. The parent process loads the artifacts, binds
+# the socket and forks one server per core; children share the model memory
+# copy-on-write and accept from the same listening socket. Each child handles
+# its keep-alive connections on threads.
+
+MAX_BODY_BYTES = 8 * 1024 * 1024
+
+
+def make_handler(handle_message):
+    class PredictHandler(BaseHTTPRequestHandler):
+        # HTTP/1.1 keeps connections open between requests
+        protocol_version = "HTTP/1.1"
+        # Headers and body are separate writes; with Nagle on, the body waits
+        # for the client's delayed ACK (~40ms per request on keep-alive)
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            # No per-request access log on the hot path
+            pass
+
+        def send_json(self, status, payload):
+            body = dumps_bytes(payload)
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def read_json(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > MAX_BODY_BYTES:
+                raise ValueError(f"body larger than {MAX_BODY_BYTES} bytes")
+            return loads(self.rfile.read(length) or b"null")
+
+        def do_GET(self):
+            if urlsplit(self.path).path != "/health":
+                self.send_json(404, {"error": f"Not found: {self.path}"})
+                return
+            self.send_json(200, dict(handle_message({"op": "stats"}), ok=True, pid=os.getpid()))
+
+        def do_POST(self):
+            url = urlsplit(self.path)
+            timings = parse_qs(url.query).get("timings", ["0"])[-1] == "1"
+            if url.path not in ("/predict", "/predict/batch", "/profile"):
+                self.send_json(404, {"error": f"Not found: {url.path}"})
+                return
+            try:
+                body = self.read_json()
+            except ValueError as e:
+                # The unread body would corrupt the next request on this connection
+                self.close_connection = True
+                self.send_json(400, {"error": f"Invalid JSON: {e}"})
+                return
+
+            if url.path == "/profile":
+                # Profiles the process that took this connection; SIGUSR2 to
+                # the parent profiles every process
+                options = body if isinstance(body, dict) else {}
+                reply = handle_message({"op": "profile", "seconds": options.get("seconds"),
+                                        "requests": options.get("requests")})
+                self.send_json(400 if "error" in reply else 200, reply)
+                return
+
+            if url.path == "/predict":
+                if not isinstance(body, dict):
+                    self.send_json(400, {"error": "Expected a JSON object"})
+                    return
+                result = handle_message({"op": "predict", "input": body, "timings": timings})["result"]
+                self.send_json(400 if result.error is not None else 200, result)
+                return
+
+            # A bare array or {"inputs": [...]}
+            inputs = body.get("inputs") if isinstance(body, dict) else body
+            if not isinstance(inputs, list):
+                self.send_json(400, {"error": "Expected a JSON array of inputs"})
+                return
+            reply = handle_message({"op": "predict_batch", "inputs": inputs, "timings": timings})
+            self.send_json(400 if "error" in reply else 200, reply)
+
+    return PredictHandler
+
+
+class PredictHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def serve(handle_message, host="127.0.0.1", port=8765, processes=None, on_start=None):
+    """Serve /predict, /predict/batch, /profile and /health until SIGTERM or Ctrl+C.
+
+    on_start runs in each serving process before it accepts requests, after
+    the fork, so it can start background threads.
+    """
+    server = PredictHTTPServer((host, port), make_handler(handle_message))
+    processes = processes or os.cpu_count() or 1
+    print(f"Prediction service on http://{host}:{server.server_address[1]} ({processes} processes)",
+          file=sys.stderr, flush=True)
+
+    if processes <= 1 or not hasattr(os, "fork"):
+        if on_start is not None:
+            on_start()
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        return
+
+    children = set()
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            if hasattr(signal, "SIGUSR2"):
+                # Ignored unless on_start installs a handler
+                signal.signal(signal.SIGUSR2, signal.SIG_IGN)
+            try:
+                if on_start is not None:
+                    on_start()
+                server.serve_forever()
+            finally:
+                os._exit(0)
+        children.add(pid)
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def forward(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    if hasattr(signal, "SIGUSR2"):
+        # Profile requests (see profiler.py) go to every serving process
+        signal.signal(signal.SIGUSR2, forward)
+    for _ in range(processes):
+        spawn()
+
+    # Replace children that die until asked to stop
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        children.discard(pid)
+        if not stopping:
+            print(f"Prediction worker {pid} exited with status {status}; restarting", file=sys.stderr, flush=True)
+            spawn()
+    server.server_close()
@@ -0,0 +1,111 @@
+import sys
+from collections import namedtuple
+
+# Lookup tables shared by main.py and both predict.py variants. They are built
+# once from the DataFrames at load time so a request never filters pandas.
+
+DosageRecord = namedtuple("DosageRecord", ["concentration", "dosage", "timing"])
+CompositionRecord = namedtuple("CompositionRecord", ["source", "chemical_composition"])
+# Single-symptom fallback remedy, already joined with its composition row
+FallbackRecord = namedtuple("FallbackRecord", ["remedy", "concentration", "dosage", "timing", "composition"])
+
+# Shared negative result for remedies missing from the composition table
+COMPOSITION_NOT_FOUND = CompositionRecord(None, None)
+
+
+def _column(df, name):
+    return df[name].tolist() if name in df.columns else [None] * len(df)
+
+
+def build_dosage_index(dosage_df):
+    """Map (remedy_lower, age_category, GENDER) to the first matching dosage row."""
+    index = {}
+    if dosage_df is None or not all(col in dosage_df.columns for col in ("Remedy", "Age Category", "Gender")):
+        return index
+    rows = zip(
+        _column(dosage_df, "Remedy"),
+        _column(dosage_df, "Age Category"),
+        _column(dosage_df, "Gender"),
+        _column(dosage_df, "Concentration"),
+        _column(dosage_df, "Dosage"),
+        _column(dosage_df, "Timing"),
+    )
+    for remedy, age_category, gender, concentration, dosage, timing in rows:
+        # Blank cells can never match a lookup, same as the old str-accessor masks
+        if not isinstance(remedy, str) or not isinstance(gender, str):
+            continue
+        # First row wins, matching match.iloc[0] on the old filtered frame
+        index.setdefault(
+            (remedy.lower(), age_category, gender.upper()),
+            DosageRecord(concentration, dosage, timing),
+        )
+    return index
+
+
+def lookup_dosage(index, remedy, age_category, gender):
+    """Return the DosageRecord for an upper-cased gender, or None."""
+    return index.get((remedy.lower(), age_category, gender))
+
+
+def build_composition_index(composition_df):
+    """Map the stripped, upper-cased remedy name to its first composition row."""
+    index = {}
+    if composition_df is None or "Remedy" not in composition_df.columns:
+        return index
+    rows = zip(
+        _column(composition_df, "Remedy"),
+        _column(composition_df, "Source"),
+        _column(composition_df, "Chemical Composition"),
+    )
+    for remedy, source, composition in rows:
+        if not isinstance(remedy, str):
+            continue
+        index.setdefault(remedy.strip().upper(), CompositionRecord(source, composition))
+    return index
+
+
+def lookup_composition(index, remedy):
+    """Return the CompositionRecord for a remedy, or COMPOSITION_NOT_FOUND."""
+    return index.get(remedy.strip().upper(), COMPOSITION_NOT_FOUND)
+
+
+def build_fallback_index(fallback_table, composition_index):
+    """Map each symptom of the fallback table to a FallbackRecord.
+
+    The composition row is looked up here, once (None when the remedy is not
+    in the composition table), so a single-symptom request is a plain dict
+    lookup.
+    """
+    return {
+        symptom: FallbackRecord(
+            entry["remedy"],
+            entry["concentration"],
+            entry["dosage"],
+            entry["timing"],
+            composition_index.get(entry["remedy"].strip().upper()),
+        )
+        for symptom, entry in fallback_table.items()
+    }
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+def compact_index(index):
+    """Return a copy of a lookup index with its strings interned and equal
+    records shared, for the low-memory mode of predict.py.
+
+    Dosage rows repeat the same concentration/dosage/timing text across age
+    and gender keys, so most records collapse into a few shared tuples.
+    """
+    records = {}
+    compact = {}
+    for key, record in index.items():
+        if isinstance(key, tuple):
+            key = tuple(_intern(part) for part in key)
+        else:
+            key = _intern(key)
+        record = type(record)._make(_intern(value) for value in record)
+        compact[key] = records.setdefault(record, record)
+    return compact
@@ -1,39 +1,149 @@
-import pandas as pd
-import joblib
-import json
+import argparse
+import gc
+import os
+import resource
+import signal
 import sys
-from pathlib import Path
+import threading
+from concurrent.futures import wait
 
-# Load data and models
-base_dir = Path(__file__).resolve().parent.parent.parent / "artifacts"
-composition_df = pd.read_csv(base_dir / "data" / "Remedy_Composition_FINAL_Merged.csv")
-composition_df['Remedy'] = composition_df['Remedy'].str.strip().str.upper()
+from answers import load_answer_table
+from artifacts import load_artifacts
+from batching import MicroBatcher
+from cache import PredictionCache, cache_key
+from ensemble import TriagePredictor
+from lookups import COMPOSITION_NOT_FOUND, compact_index, lookup_composition, lookup_dosage
+from profiler import SamplingProfiler
+from records import CompositionDetails, DosageDetails, ErrorResult, Predicted, TriageResult
+from registry import ModelRegistry
+from serialization import (
+    decode_frame,
+    dumps_bytes,
+    encode_frame,
+    loads,
+    prerender,
+    read_frames,
+    require_framing,
+    write_json_array,
+)
+from timings import NULL_TIMER, PhaseTimer
+from validation import AGE_CATEGORIES, GENDERS, InputValidator
 
-training_df = pd.read_csv(base_dir / "data" / "Balanced_SPID_Dataset.csv")
-symptom_columns = training_df.drop(columns=['SPID', 'Remedy', 'UrgencyScore', 'UrgencyCategory', 'UrgencyCategoryEncoded', 'Condition'], errors='ignore').columns.tolist()
+# CAREMATE_TIMINGS=1 (or --timings) adds a per-phase "timings" block to every
+# result; worker requests can also ask for it with "timings": true
+TIMINGS_ENABLED = os.environ.get("CAREMATE_TIMINGS") == "1"
 
-model_dir = base_dir / "model"
-clfu = joblib.load(model_dir / "balanced_urgency_classifier.pkl")
-reg = joblib.load(model_dir / "urgency_gb_regressor.pkl")
-clfr = joblib.load(model_dir / "balanced_remedy_classifier.pkl")
+# CAREMATE_LOW_MEMORY=1 trades startup time for a smaller resident worker:
+# models are compiled to compact flat arrays and the scikit-learn objects
+# released, and the lookup indexes share their strings and records.
+# CAREMATE_SHRINK_MODELS=1 also stores classifier leaves as float32 where
+# that still gives identical predictions.
+LOW_MEMORY = os.environ.get("CAREMATE_LOW_MEMORY") == "1"
+SHRINK_MODELS = os.environ.get("CAREMATE_SHRINK_MODELS") == "1"
 
-dosage_df = pd.read_csv(base_dir / "data" / "Complete_Remedy_Dosage_Dataset.xls")
-dosage_df.columns = [col.strip() for col in dosage_df.columns]
+# On-demand profiles of a running worker (see profiler.py): the "profile" op,
+# or SIGUSR2 for CAREMATE_PROFILE_SECONDS. Folded stacks are written to
+# CAREMATE_PROFILE_DIR (default: the system temp directory).
+PROFILE_SECONDS = float(os.environ.get("CAREMATE_PROFILE_SECONDS", "30"))
+profiler = SamplingProfiler(os.environ.get("CAREMATE_PROFILE_DIR"))
+
+# Load data and models (from the compiled bundle when it is up to date)
+startup_timer = PhaseTimer()
+artifacts = load_artifacts()
+startup_timer.lap("artifact_load")
+symptom_columns = artifacts["symptom_columns"]
+# Checks requests and builds the model input rows (see validation.py)
+validator = InputValidator(symptom_columns)
+composition_index = artifacts["composition_index"]
+dosage_index = artifacts["dosage_index"]
+if LOW_MEMORY:
+    composition_index = compact_index(composition_index)
+    dosage_index = compact_index(dosage_index)
+
+category_map = {1: "Low", 2: "Moderate", 3: "High"}
+
+# All three models behind one call; CAREMATE_COMPILE_TREES=1 switches tree
+# ensembles to flat-array traversal after a parity check
+def make_predictor(models, model_columns):
+    return TriagePredictor(
+        models,
+        model_columns,
+        compile_trees=os.environ.get("CAREMATE_COMPILE_TREES") == "1",
+        compact=LOW_MEMORY,
+        shrink_leaves=SHRINK_MODELS,
+    )
+
+# Finished model results keyed by (severity vector, age category, gender),
+# valid for one model version. Created before the registry, whose swaps
+# move it to the new version
+prediction_cache = PredictionCache(
+    maxsize=int(os.environ.get("CAREMATE_CACHE_SIZE", "4096")),
+    ttl=float(os.environ["CAREMATE_CACHE_TTL"]) if os.environ.get("CAREMATE_CACHE_TTL") else None,
+    version=artifacts["model_version"],
+)
+
+# Long-lived modes pick up new model files without a restart (see registry.py);
+# every request uses registry.current, which a reload swaps atomically
+registry = ModelRegistry(
+    artifacts["models"],
+    artifacts["model_version"],
+    symptom_columns,
+    make_predictor,
+    categories=category_map,
+    on_swap=lambda model_set: prediction_cache.set_version(model_set.version),
+)
+predictor = registry.current.predictor
+if LOW_MEMORY:
+    # The predictor and the compacted indexes hold all that is still needed
+    for name in ("models", "composition_index", "dosage_index"):
+        artifacts.pop(name)
+    gc.collect()
+startup_timer.lap("predictor_init")
+
+# Precomputed answers for sparse inputs (see answers.py), used while the
+# current models are the ones it was built from. CAREMATE_ANSWER_TABLE=0 skips it.
+answer_table = load_answer_table(symptom_columns) if os.environ.get("CAREMATE_ANSWER_TABLE", "1") != "0" else None
+startup_timer.lap("answer_table")
+
+# Details records are immutable, so one per remedy (and age/gender for
+# dosage) is built once, with its encoded JSON (see serialization.py), and
+# shared by every result that needs it. warm_details builds them all up front.
+_composition_details = {}
+_dosage_details = {}
+
+def composition_details(remedy, match):
+    if match is None or match is COMPOSITION_NOT_FOUND:
+        return CompositionDetails(
+            remedy,
+            "Not found",
+            f"❗ Chemical composition for remedy '{remedy}' not found."
+        )
+    return CompositionDetails(remedy, match.source, match.chemical_composition)
 
 def get_composition_details(predicted_remedy):
-    remedy = predicted_remedy.strip().upper()
-    match = composition_df[composition_df['Remedy'] == remedy]
-    if match.empty:
-        return {
-            "Remedy": predicted_remedy,
-            "Source": "Not found",
-            "Chemical Composition": f"❗ Chemical composition for remedy '{predicted_remedy}' not found."
-        }
-    return {
-        "Remedy": predicted_remedy,
-        "Source": match['Source'].values[0],
-        "Chemical Composition": match['Chemical Composition'].values[0]
-    }
+    details = _composition_details.get(predicted_remedy)
+    if details is not None:
+        return details
+    details = prerender(composition_details(predicted_remedy, lookup_composition(composition_index, predicted_remedy)))
+    _composition_details[predicted_remedy] = details
+    return details
+
+# Single-symptom remedies from the shared fallback table, joined with their
+# compositions at load time, with the dosage part per (age category, gender)
+fallback_details = {
+    symptom: (
+        Predicted(None, None, record.remedy),
+        prerender(composition_details(record.remedy, record.composition)),
+        {
+            (age_category, gender): prerender(
+                DosageDetails(record.concentration, record.dosage, record.timing, age_category, gender)
+            )
+            for age_category in AGE_CATEGORIES
+            for gender in GENDERS
+        },
+    )
+    for symptom, record in artifacts["fallback_index"].items()
+}
 
 def get_age_category(age):
     if age <= 12:
@@ -45,220 +155,301 @@ def get_age_category(age):
     else:
         return "Senior"
 
-fallback_remedy_map = {
-    'Cough': {
-        'remedy': 'Bryonia alba',
-        'concentration': '30C',
-        'dosage': '3 pellets',
-        'timing': 'Twice daily after meals'
-    },
-    'Fever': {
-        'remedy': 'Aconitum napellus',
-        'concentration': '200C',
-        'dosage': '2 drops in water',
-        'timing': 'Thrice daily until fever subsides'
-    },
-    'Headache': {
-        'remedy': 'Belladonna',
-        'concentration': '30C',
-        'dosage': '3 pellets',
-        'timing': 'Every 4 hours until relief'
-    },
-    'Fatigue': {
-        'remedy': 'Gelsemium sempervirens',
-        'concentration': '30C',
-        'dosage': '2 tablets',
-        'timing': 'Twice a day'
-    },
-    'Skin Rash': {
-        'remedy': 'Sulphur',
-        'concentration': '200C',
-        'dosage': '3 pellets',
-        'timing': 'Once daily in the morning'
-    },
-    'Runny Nose': {
-        'remedy': 'Allium cepa',
-        'concentration': '30C',
-        'dosage': '2 drops',
-        'timing': 'Every 3 hours'
-    },
-    'Sore Throat': {
-        'remedy': 'Hepar sulphuris',
-        'concentration': '30C',
-        'dosage': '3 pellets',
-        'timing': 'Twice daily'
-    },
-    'Body Ache': {
-        'remedy': 'Rhus toxicodendron',
-        'concentration': '30C',
-        'dosage': '3 tablets',
-        'timing': 'Morning and evening'
-    },
-    'Nausea': {
-        'remedy': 'Nux vomica',
-        'concentration': '30C',
-        'dosage': '5 drops in water',
-        'timing': 'Before meals'
-    },
-    'Constipation': {
-        'remedy': 'Opium',
-        'concentration': '200C',
-        'dosage': '3 pellets',
-        'timing': 'Once every morning'
-    },
-    'Diarrhea': {
-        'remedy': 'Aloe socotrina',
-        'concentration': '30C',
-        'dosage': '2 drops',
-        'timing': 'After every loose stool'
-    },
-    'Vomiting': {
-        'remedy': 'Ipecacuanha',
-        'concentration': '30C',
-        'dosage': '3 pellets',
-        'timing': 'Twice daily'
-    },
-    'Back Pain': {
-        'remedy': 'Kali carbonicum',
-        'concentration': '30C',
-        'dosage': '3 tablets',
-        'timing': 'Twice daily after food'
-    },
-    'Joint Pain': {
-        'remedy': 'Bryonia alba',
-        'concentration': '200C',
-        'dosage': '2 drops in water',
-        'timing': 'Morning and evening'
-    },
-    'Insomnia': {
-        'remedy': 'Coffea cruda',
-        'concentration': '30C',
-        'dosage': '3 pellets',
-        'timing': '30 minutes before bed'
-    },
-    'Anxiety': {
-        'remedy': 'Argentum nitricum',
-        'concentration': '30C',
-        'dosage': '2 tablets',
-        'timing': 'Thrice daily'
-    },
-    'Depression': {
-        'remedy': 'Ignatia amara',
-        'concentration': '200C',
-        'dosage': '5 pellets',
-        'timing': 'Morning and night'
-    },
-    'Burning Sensation': {
-        'remedy': 'Cantharis',
-        'concentration': '30C',
-        'dosage': '3 pellets',
-        'timing': 'Every 4 hours'
-    },
-    'Swelling': {
-        'remedy': 'Apis mellifica',
-        'concentration': '30C',
-        'dosage': '2 tablets',
-        'timing': 'Twice a day'
-    },
-    'Indigestion': {
-        'remedy': 'Carbo vegetabilis',
-        'concentration': '30C',
-        'dosage': '5 drops',
-        'timing': 'After meals'
-    },
-    'Chest Pain': {
-        'remedy': 'Cactus grandiflorus',
-        'concentration': '30C',
-        'dosage': '3 pellets',
-        'timing': 'Every 4 hours'
-    }
-}
-
-def predict(input_data):
-    symptoms = input_data['symptoms']
-    age = input_data['age']
-    gender = input_data['gender'].upper()
-    age_category = get_age_category(age)
-
-    # Validate symptoms
-    invalid_symptoms = [s for s in symptoms if s not in symptom_columns]
-    if invalid_symptoms:
-        return {"error": f"Invalid symptoms: {invalid_symptoms}. Valid: {symptom_columns}"}
-
-    # Validate gender
-    if gender not in ['M', 'F', 'OTHER']:
-        return {"error": f"Invalid gender: {gender}. Valid: M, F, Other"}
-
-    user_input = {s: symptoms.get(s, 0) for s in symptom_columns}
-    input_df = pd.DataFrame([user_input])[symptom_columns]
-    non_zero_symptoms = [s for s, v in symptoms.items() if v > 0]
-
-    if len(non_zero_symptoms) == 0:
-        return {"error": "No symptoms provided. Please enter at least one symptom."}
-    elif len(non_zero_symptoms) == 1:
-        symptom = non_zero_symptoms[0]
-        generic_remedy = fallback_remedy_map.get(symptom)
-        if not generic_remedy:
-            return {"error": f"No fallback for single symptom: {symptom}"}
-        return {
-            "predicted": {
-                "UrgencyScore": None,
-                "UrgencyCategory": None,
-                "Remedy": generic_remedy['remedy']
-            },
-            "dosage": {
-                "Concentration": generic_remedy['concentration'],
-                "Dosage": generic_remedy['dosage'],
-                "Timing": generic_remedy['timing'],
-                "Age Category": age_category,
-                "Gender": gender
-            },
-            "composition": get_composition_details(generic_remedy['remedy']),
-            "fallbackUsed": True
-        }
+def get_dosage_details(predicted_remedy, age_category, gender):
+    key = (predicted_remedy, age_category, gender)
+    details = _dosage_details.get(key)
+    if details is not None:
+        return details
+    match = lookup_dosage(dosage_index, predicted_remedy, age_category, gender)
+    if match is not None:
+        details = DosageDetails(match.concentration, match.dosage, match.timing, age_category, gender)
     else:
-        # Predictions
-        predicted_category = clfu.predict(input_df)[0]
-        predicted_score = reg.predict(input_df)[0]
-        predicted_remedy = clfr.predict(input_df)[0]
-        category_map = {1: "Low", 2: "Moderate", 3: "High"}
-
-        # Dosage
-        match = dosage_df[
-            (dosage_df['Remedy'].str.lower() == predicted_remedy.lower()) &
-            (dosage_df['Age Category'] == age_category) &
-            (dosage_df['Gender'].str.upper() == gender)
-        ]
-        if not match.empty:
-            dosage_info = match.iloc[0]
-            dosage = {
-                "Concentration": dosage_info['Concentration'],
-                "Dosage": dosage_info['Dosage'],
-                "Timing": dosage_info['Timing'],
-                "Age Category": age_category,
-                "Gender": gender
-            }
+        details = DosageDetails(None, "Dosage information not found.", None, age_category, gender)
+    _dosage_details[key] = prerender(details)
+    return details
+
+def warm_details(remedies):
+    # Every dosage and composition part a model result can contain,
+    # including the "not found" variants, so no request builds or encodes one
+    for remedy in remedies:
+        get_composition_details(remedy)
+        for age_category in AGE_CATEGORIES:
+            for gender in GENDERS:
+                get_dosage_details(remedy, age_category, gender)
+
+warm_details(predictor.remedies.tolist())
+startup_timer.lap("details")
+startup_timings = startup_timer.as_dict()
+
+def fallback_result(symptom, age_category, gender, model_version):
+    details = fallback_details.get(symptom)
+    if details is None:
+        return ErrorResult(f"No fallback for single symptom: {symptom}")
+    predicted, composition, dosage = details
+    return TriageResult(
+        predicted,
+        dosage[age_category, gender],
+        composition,
+        True,
+        model_version
+    )
+
+def model_result(predicted_category, predicted_score, predicted_remedy, age_category, gender, model_version):
+    return TriageResult(
+        Predicted(round(predicted_score, 2), category_map[predicted_category], predicted_remedy),
+        get_dosage_details(predicted_remedy, age_category, gender),
+        get_composition_details(predicted_remedy),
+        False,
+        model_version
+    )
+
+def predict_batch(inputs, timer=NULL_TIMER):
+    """Score many patients with one call per model.
+
+    Returns one result record per input, in order (see records.py). Rows that
+    fail validation get an ErrorResult instead of failing the whole batch.
+    Phase timings for the whole batch are recorded on timer.
+    """
+    # One model set for the whole batch, even if a reload swaps it meanwhile
+    active = registry.current
+    results = [None] * len(inputs)
+    checked = validator.validate_batch(inputs)
+    timer.lap("validate")
+
+    model_rows = []
+    for i, errors in enumerate(checked.errors):
+        if errors:
+            results[i] = ErrorResult("; ".join(errors))
+        elif checked.symptom_counts[i] == 0:
+            results[i] = ErrorResult("No symptoms provided. Please enter at least one symptom.")
+        elif checked.symptom_counts[i] == 1:
+            symptom = symptom_columns[checked.matrix[i].argmax()]
+            results[i] = fallback_result(symptom, checked.age_categories[i], checked.genders[i], active.version)
+        else:
+            model_rows.append(i)
+    timer.lap("fallback")
+
+    if model_rows and answer_table is not None:
+        answers = answer_table.lookup(checked.matrix[model_rows], active.version)
+        unanswered = []
+        for i, answer in zip(model_rows, answers):
+            if answer is None:
+                unanswered.append(i)
+            else:
+                results[i] = model_result(*answer, checked.age_categories[i], checked.genders[i], active.version)
+        model_rows = unanswered
+        timer.lap("answers")
+
+    pending = []
+    for i in model_rows:
+        key = cache_key(checked.matrix[i], checked.age_categories[i], checked.genders[i])
+        cached = prediction_cache.get(key)
+        if cached is not None:
+            results[i] = cached
         else:
-            dosage = {
-                "Concentration": None,
-                "Dosage": "Dosage information not found.",
-                "Timing": None,
-                "Age Category": age_category,
-                "Gender": gender
-            }
+            pending.append((i, key))
+    timer.lap("cache")
+
+    if pending:
+        X = checked.matrix[[i for i, _ in pending]]
+        timer.lap("build_matrix")
+        categories, scores, remedies = active.predictor.predict(X, timer)
+        for j, (i, key) in enumerate(pending):
+            results[i] = model_result(
+                categories[j], scores[j], remedies[j], checked.age_categories[i], checked.genders[i], active.version
+            )
+            prediction_cache.put(key, results[i], active.version)
+        timer.lap("lookups")
+    if profiler.active:
+        profiler.count_requests(len(inputs))
+    return results
+
+def predict(input_data, timer=NULL_TIMER):
+    return predict_batch([input_data], timer)[0]
+
+def request_timer(requested=False):
+    return PhaseTimer() if requested or TIMINGS_ENABLED else NULL_TIMER
+
+def with_timings(result, timer):
+    if not timer.enabled:
+        return result
+    return result.with_timings(timer.as_dict())
+
+# Concurrent single requests in the worker and HTTP modes are scored together:
+# up to CAREMATE_BATCH_MAX_ROWS rows, waiting at most CAREMATE_BATCH_WAIT_MS
+# for a batch to fill (0 = only what is already queued). 1 turns it off.
+batch_max_rows = int(os.environ.get("CAREMATE_BATCH_MAX_ROWS", "64"))
+batcher = MicroBatcher(
+    predict_batch,
+    max_rows=batch_max_rows,
+    max_wait_ms=float(os.environ.get("CAREMATE_BATCH_WAIT_MS", "0")),
+) if batch_max_rows > 1 else None
+
+def memory_stats():
+    # Current RSS from /proc where available (Linux); the peak from getrusage
+    try:
+        with open("/proc/self/statm") as f:
+            rss_kb = int(f.read().split()[1]) * (os.sysconf("SC_PAGE_SIZE") // 1024)
+    except (OSError, ValueError, IndexError):
+        rss_kb = None
+    current = registry.current.predictor
+    return {
+        "rss_kb": rss_kb,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "low_memory": LOW_MEMORY,
+        "compiled_models": sorted(current.compiled),
+        "compiled_bytes": sum(current.model_bytes().values()),
+    }
+
+def batched_reply(future):
+    try:
+        return {"result": future.result()}
+    except Exception as e:
+        return {"result": ErrorResult(str(e))}
 
+def handle_message(message):
+    op = message.get("op", "predict")
+    if op == "ping":
+        return {"ok": True}
+    if op == "stats":
         return {
-            "predicted": {
-                "UrgencyScore": round(predicted_score, 2),
-                "UrgencyCategory": category_map[predicted_category],
-                "Remedy": predicted_remedy
-            },
-            "dosage": dosage,
-            "composition": get_composition_details(predicted_remedy),
-            "fallbackUsed": False
+            "cache": prediction_cache.stats(),
+            "batching": batcher.stats() if batcher is not None else None,
+            "answers": answer_table.stats() if answer_table is not None else None,
+            "model": registry.stats(),
+            "memory": memory_stats(),
+            "profiler": profiler.stats(),
+            "startup": startup_timings,
         }
+    if op == "profile":
+        # Sample this process for N seconds or until N more inputs are scored
+        try:
+            path = profiler.start(message.get("seconds"), message.get("requests"))
+        except (TypeError, ValueError) as e:
+            return {"error": f"Invalid profile request: {e}"}
+        if path is None:
+            return {"error": "A profile is already running", "profiler": profiler.stats()}
+        return {"profiling": path, "pid": os.getpid()}
+    if op == "reload":
+        # Check artifacts/model now instead of waiting for the watcher
+        return {"reloaded": registry.reload(), "model": registry.stats()}
+    timer = request_timer(message.get("timings"))
+    if op == "predict" and batcher is not None:
+        return batched_reply(batcher.submit(message.get("input"), timer.enabled))
+    if op == "predict":
+        try:
+            return {"result": with_timings(predict(message["input"], timer), timer)}
+        except Exception as e:
+            return {"result": ErrorResult(str(e))}
+    if op == "predict_batch":
+        try:
+            results = predict_batch(message["inputs"], timer)
+        except Exception as e:
+            return {"error": str(e)}
+        reply = {"results": results}
+        if timer.enabled:
+            reply["timings"] = timer.as_dict()
+        return reply
+    return {"error": f"Unknown op: {op}"}
+
+def start_background():
+    # Runs in each serving process of the worker and HTTP modes. Seconds
+    # between checks of artifacts/model for a new release; 0 disables
+    registry.start(float(os.environ.get("CAREMATE_MODEL_WATCH_INTERVAL", "5")))
+    if hasattr(signal, "SIGUSR2"):
+        signal.signal(signal.SIGUSR2, profile_on_signal)
+
+def profile_on_signal(signum, frame):
+    # The handler runs on the main thread, which in worker mode may be inside
+    # profiler.stats() or start() holding the profiler lock; starting from
+    # another thread waits for that lock instead of deadlocking on it
+    threading.Thread(target=profiler.start, kwargs={"seconds": PROFILE_SECONDS},
+                     name="profile-signal", daemon=True).start()
+
+def serve_worker(stream_in=sys.stdin.buffer, stream_out=sys.stdout.buffer, framing="json"):
+    # Long-lived mode: artifacts are already loaded at import, so each frame
+    # on stdin is one request and each frame on stdout is its reply. Frames
+    # are JSON lines, or length-prefixed msgpack with framing="msgpack".
+    require_framing(framing)
+    write_lock = threading.Lock()
+
+    def send(reply):
+        frame = encode_frame(reply, framing)
+        with write_lock:
+            stream_out.write(frame)
+            stream_out.flush()
+
+    in_flight = set()
+
+    def send_batched(message_id, future):
+        send(dict(batched_reply(future), id=message_id))
+        in_flight.discard(future)
+
+    start_background()
+    send({"ready": True})
+    for payload in read_frames(stream_in, framing):
+        try:
+            message = decode_frame(payload, framing)
+        except ValueError as e:
+            send({"id": None, "error": f"Invalid {framing}: {e}"})
+            continue
+        if not isinstance(message, dict):
+            send({"id": None, "error": "Expected a request object"})
+            continue
+        if batcher is not None and message.get("op", "predict") == "predict":
+            # Pipelined predict requests are batched; each reply is written
+            # when its batch finishes and the id ties it to the request
+            future = batcher.submit(message.get("input"), bool(message.get("timings")) or TIMINGS_ENABLED)
+            in_flight.add(future)
+            future.add_done_callback(lambda f, message_id=message.get("id"): send_batched(message_id, f))
+            continue
+        reply = handle_message(message)
+        reply["id"] = message.get("id")
+        send(reply)
+    # stdin closed: finish what is still queued before exiting
+    wait(list(in_flight))
 
 if __name__ == "__main__":
-    input_data = json.loads(sys.stdin.read())
-    result = predict(input_data)
-    print(json.dumps(result))
+    parser = argparse.ArgumentParser(description="CareMate triage prediction")
+    parser.add_argument("--worker", action="store_true",
+                        help="serve line-delimited JSON requests on stdin/stdout")
+    parser.add_argument("--framing", choices=("json", "msgpack"),
+                        default=os.environ.get("CAREMATE_WORKER_FRAMING", "json"),
+                        help="worker message framing: JSON lines or length-prefixed msgpack")
+    parser.add_argument("--http", action="store_true",
+                        help="serve /predict, /predict/batch, /profile and /health over HTTP")
+    parser.add_argument("--host", default=os.environ.get("CAREMATE_HTTP_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("CAREMATE_HTTP_PORT", "8765")))
+    parser.add_argument("--processes", type=int, default=int(os.environ.get("CAREMATE_HTTP_PROCESSES", "0")),
+                        help="HTTP server processes (default: one per core)")
+    parser.add_argument("--timings", action="store_true",
+                        help="add per-phase timings (ms) to each result")
+    args = parser.parse_args()
+    TIMINGS_ENABLED = TIMINGS_ENABLED or args.timings
+
+    if args.http:
+        from http_service import serve
+        serve(handle_message, args.host, args.port, args.processes or None, on_start=start_background)
+    elif args.worker:
+        serve_worker(framing=args.framing)
+    else:
+        input_data = loads(sys.stdin.buffer.read())
+        timer = request_timer()
+        # A JSON array on stdin is scored as one batch and streamed back out;
+        # with timings, as {"results": [...], "timings": {...}} like the
+        # worker's predict_batch reply
+        if isinstance(input_data, list):
+            results = predict_batch(input_data, timer)
+            if timer.enabled:
+                sys.stdout.buffer.write(b'{"results":')
+                write_json_array(sys.stdout.buffer, results, end=b"")
+                timings = dict(timer.as_dict(), startup=startup_timings)
+                sys.stdout.buffer.write(b',"timings":' + dumps_bytes(timings) + b"}\n")
+            else:
+                write_json_array(sys.stdout.buffer, results)
+        else:
+            result = with_timings(predict(input_data, timer), timer)
+            if timer.enabled:
+                result.timings["startup"] = startup_timings
+            sys.stdout.buffer.write(dumps_bytes(result) + b"\n")
+        sys.stdout.buffer.flush()
@@ -0,0 +1,162 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+# On-demand sampling profiler for the long-lived modes of predict.py. While a
+# profile runs, a background thread reads every other thread's stack
+# (sys._current_frames) at a fixed interval and counts identical stacks;
+# threads whose CPU clock has not moved since the last sample are idle
+# (blocked on stdin, a socket or a lock) and are left out. The result is
+# written as folded stacks, one "thread;frame;...;frame count" line per
+# stack, which flamegraph.pl, inferno and speedscope read directly.
+#
+# With no profile running there is no sampler thread and no trace hook; the
+# request path only checks profiler.active.
+
+DEFAULT_INTERVAL_MS = 5
+# A profile never runs longer than this, whatever the request count
+MAX_SECONDS = 600
+
+
+def _short_path(filename):
+    # site-packages/sklearn/ensemble/_forest.py -> sklearn/ensemble/_forest.py
+    for marker in ("site-packages" + os.sep, "dist-packages" + os.sep):
+        index = filename.rfind(marker)
+        if index >= 0:
+            return filename[index + len(marker):]
+    return os.path.basename(filename)
+
+
+def _thread_clock(ident):
+    # Per-thread CPU clock (Linux and most Unixes); None where unavailable
+    try:
+        return time.pthread_getcpuclockid(ident)
+    except (AttributeError, OSError):
+        return None
+
+
+class SamplingProfiler:
+    """Start with start(seconds=...) or start(requests=...); stops itself.
+
+    Only one profile runs at a time. last holds a summary of the most recent
+    finished profile.
+    """
+
+    def __init__(self, output_dir=None, interval_ms=DEFAULT_INTERVAL_MS):
+        self.output_dir = output_dir or tempfile.gettempdir()
+        self.interval = interval_ms / 1000
+        self.active = False
+        self.last = None
+        self._requests = 0
+        self._max_requests = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._labels = {}
+
+    def start(self, seconds=None, requests=None, path=None):
+        """Begin sampling for `seconds`, or until `requests` inputs were
+        scored (whichever comes first when both are given). Returns the
+        output path, or None if a profile is already running."""
+        if seconds is None and requests is None:
+            raise ValueError("profile needs seconds or requests")
+        seconds = min(float(seconds), MAX_SECONDS) if seconds is not None else MAX_SECONDS
+        if seconds <= 0 or (requests is not None and int(requests) <= 0):
+            raise ValueError("seconds and requests must be positive")
+        with self._lock:
+            if self.active:
+                return None
+            if path is None:
+                stamp = time.strftime("%Y%m%dT%H%M%S")
+                path = os.path.join(self.output_dir, f"caremate-profile-{os.getpid()}-{stamp}.folded")
+            self._requests = 0
+            self._max_requests = int(requests) if requests is not None else None
+            self._stop.clear()
+            self.active = True
+        thread = threading.Thread(target=self._run, args=(seconds, path), name="profiler", daemon=True)
+        thread.start()
+        limit = f"{self._max_requests} requests (at most {seconds:g}s)" if self._max_requests else f"{seconds:g}s"
+        print(f"Profiling for {limit} -> {path}", file=sys.stderr, flush=True)
+        return path
+
+    def count_requests(self, n=1):
+        # Called by the request path only while a profile is active
+        self._requests += n
+        if self._max_requests is not None and self._requests >= self._max_requests:
+            self._stop.set()
+
+    def stop(self):
+        self._stop.set()
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            name = getattr(code, "co_qualname", code.co_name)
+            label = f"{name} ({_short_path(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+            self._labels[code] = label
+        return label
+
+    def _run(self, seconds, path):
+        own = threading.get_ident()
+        stacks = Counter()
+        cpu_seen = {}
+        samples = 0
+        started = time.monotonic()
+        deadline = started + seconds
+        try:
+            while not self._stop.is_set() and time.monotonic() < deadline:
+                names = {t.ident: t.name for t in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == own:
+                        continue
+                    clock = _thread_clock(ident)
+                    if clock is not None:
+                        try:
+                            cpu = time.clock_gettime(clock)
+                        except OSError:
+                            # The thread exited since the frames were taken
+                            continue
+                        if cpu_seen.get(ident) == cpu:
+                            continue
+                        cpu_seen[ident] = cpu
+                    stack = []
+                    while frame is not None:
+                        stack.append(self._label(frame.f_code))
+                        frame = frame.f_back
+                    stack.append(names.get(ident, f"thread-{ident}").replace(";", ":"))
+                    stacks[";".join(reversed(stack))] += 1
+                    samples += 1
+                self._stop.wait(self.interval)
+        finally:
+            elapsed = time.monotonic() - started
+            try:
+                self._write(path, stacks)
+            except OSError as e:
+                print(f"Profile not written ({e})", file=sys.stderr, flush=True)
+                path = None
+            with self._lock:
+                self.last = {
+                    "path": path,
+                    "samples": samples,
+                    "stacks": len(stacks),
+                    "seconds": round(elapsed, 3),
+                    "requests": self._requests,
+                }
+                self.active = False
+            if path is not None:
+                print(f"Profile written: {path} ({samples} samples, {elapsed:.1f}s, {self._requests} requests)",
+                      file=sys.stderr, flush=True)
+
+    def _write(self, path, stacks):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        os.replace(tmp_path, path)
+
+    def stats(self):
+        with self._lock:
+            return {"active": self.active, "interval_ms": self.interval * 1000, "last": self.last}
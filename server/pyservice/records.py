@@ -0,0 +1,123 @@
+import copy
+
+import numpy as np
+
+# Result records for predict.py. They use __slots__ instead of nested dicts,
+# and the dosage/composition parts are shared between results with the same
+# remedy, age category and gender. Records are turned into the JSON shape
+# only when written out, by serialization.py (json_default is its hook).
+# Shared parts carry their own encoded JSON in `fragment` once
+# serialization.prerender has run on them.
+
+
+class ResultRecord:
+    __slots__ = ()
+    error = None
+
+    def with_timings(self, timings):
+        # Records may be cached and shared, so timings go on a copy
+        clone = copy.copy(self)
+        clone.timings = timings
+        return clone
+
+
+class ErrorResult(ResultRecord):
+    __slots__ = ("error", "timings")
+
+    def __init__(self, error):
+        self.error = error
+        self.timings = None
+
+    def to_dict(self):
+        out = {"error": self.error}
+        if self.timings is not None:
+            out["timings"] = self.timings
+        return out
+
+
+class Predicted:
+    __slots__ = ("urgency_score", "urgency_category", "remedy")
+
+    def __init__(self, urgency_score, urgency_category, remedy):
+        self.urgency_score = urgency_score
+        self.urgency_category = urgency_category
+        self.remedy = remedy
+
+    def to_dict(self):
+        return {
+            "UrgencyScore": self.urgency_score,
+            "UrgencyCategory": self.urgency_category,
+            "Remedy": self.remedy,
+        }
+
+
+class DosageDetails:
+    __slots__ = ("concentration", "dosage", "timing", "age_category", "gender", "fragment")
+
+    def __init__(self, concentration, dosage, timing, age_category, gender):
+        self.concentration = concentration
+        self.dosage = dosage
+        self.timing = timing
+        self.age_category = age_category
+        self.gender = gender
+        self.fragment = None
+
+    def to_dict(self):
+        return {
+            "Concentration": self.concentration,
+            "Dosage": self.dosage,
+            "Timing": self.timing,
+            "Age Category": self.age_category,
+            "Gender": self.gender,
+        }
+
+
+class CompositionDetails:
+    __slots__ = ("remedy", "source", "chemical_composition", "fragment")
+
+    def __init__(self, remedy, source, chemical_composition):
+        self.remedy = remedy
+        self.source = source
+        self.chemical_composition = chemical_composition
+        self.fragment = None
+
+    def to_dict(self):
+        return {
+            "Remedy": self.remedy,
+            "Source": self.source,
+            "Chemical Composition": self.chemical_composition,
+        }
+
+
+class TriageResult(ResultRecord):
+    __slots__ = ("predicted", "dosage", "composition", "fallback_used", "model_version", "timings")
+
+    def __init__(self, predicted, dosage, composition, fallback_used, model_version):
+        self.predicted = predicted
+        self.dosage = dosage
+        self.composition = composition
+        self.fallback_used = fallback_used
+        self.model_version = model_version
+        self.timings = None
+
+    def to_dict(self):
+        out = {
+            "predicted": self.predicted.to_dict(),
+            "dosage": self.dosage.to_dict(),
+            "composition": self.composition.to_dict(),
+            "fallbackUsed": self.fallback_used,
+            "modelVersion": self.model_version,
+        }
+        if self.timings is not None:
+            out["timings"] = self.timings
+        return out
+
+
+def json_default(obj):
+    """json.dumps hook for result records and NumPy scalars."""
+    to_dict = getattr(obj, "to_dict", None)
+    if to_dict is not None:
+        return to_dict()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
@@ -0,0 +1,143 @@
+import sys
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from artifacts import (ARTIFACTS_DIR, load_models, model_columns, model_files_version,
+                       model_fingerprint)
+from ensemble import parity_probe, parity_report
+
+# Hot reload of the three models in long-lived modes. A model release replaces
+# the .pkl files under artifacts/model; the registry notices (stat polling),
+# waits until the files stop changing, loads and smoke-tests the new set off
+# the request path, then swaps it in with a single assignment. A request
+# reads `registry.current` once and finishes on that model set even if a swap
+# happens meanwhile. Versions are content hashes (artifacts.model_version).
+
+ModelSet = namedtuple("ModelSet", ["version", "predictor", "loaded_at"])
+
+
+class ModelRegistry:
+    """The active model set plus a background watcher for new versions.
+
+    make_predictor(models, model_columns) builds the predictor for a model
+    set; categories are the urgency classes the classifier may return.
+    """
+
+    def __init__(self, models, version, symptom_columns, make_predictor, categories,
+                 artifacts_dir=ARTIFACTS_DIR, on_swap=None):
+        self.artifacts_dir = artifacts_dir
+        self.symptom_columns = symptom_columns
+        self.make_predictor = make_predictor
+        self.categories = set(categories)
+        self.on_swap = on_swap
+        self.current = ModelSet(version, make_predictor(models, self._model_columns(models)), time.time())
+        self.swaps = 0
+        self.last_error = None
+        self._loaded_fingerprint = model_fingerprint(artifacts_dir)
+        self._settling = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def _model_columns(self, models):
+        return {name: model_columns(model, self.symptom_columns) for name, model in models.items()}
+
+    def validate(self, predictor):
+        """Smoke test a candidate before it takes traffic."""
+        n_features = len(self.symptom_columns)
+        if predictor.n_features != n_features:
+            raise ValueError(f"models expect {predictor.n_features} features, data has {n_features}")
+        for name, model in predictor.models.items():
+            if getattr(model, "n_features_in_", n_features) != n_features:
+                raise ValueError(f"{name} expects {model.n_features_in_} features, data has {n_features}")
+        probe = parity_probe(n_features, n_random=256)
+        mismatches = parity_report(predictor, probe)
+        if any(mismatches.values()):
+            raise ValueError(f"predictor disagrees with the stored models: {mismatches}")
+        categories, scores, remedies = predictor.predict(probe)
+        unknown = set(np.unique(categories).tolist()) - self.categories
+        if unknown:
+            raise ValueError(f"unknown urgency categories {sorted(unknown)}")
+        if not np.all(np.isfinite(np.asarray(scores, dtype=float))):
+            raise ValueError("non-finite urgency scores")
+        if any(not isinstance(r, str) or not r for r in remedies.tolist()):
+            raise ValueError("empty or non-string remedy predictions")
+
+    def reload(self, force=False):
+        """Load, validate and swap in the model files on disk.
+
+        Returns True if a new version was swapped in. A set that fails to load
+        or validate is reported once and not retried until the files change.
+        """
+        with self._lock:
+            fingerprint = model_fingerprint(self.artifacts_dir)
+            if fingerprint is None:
+                self.last_error = "model files missing"
+                return False
+            if fingerprint == self._loaded_fingerprint and not force:
+                return False
+            self._loaded_fingerprint = fingerprint
+            try:
+                version = model_files_version(self.artifacts_dir)
+                if version == self.current.version:
+                    return False
+                models = load_models(self.artifacts_dir)
+                predictor = self.make_predictor(models, self._model_columns(models))
+                self.validate(predictor)
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                print(f"Model reload rejected ({self.last_error}); keeping {self.current.version}",
+                      file=sys.stderr, flush=True)
+                return False
+            previous = self.current.version
+            self.current = ModelSet(version, predictor, time.time())
+            self.swaps += 1
+            self.last_error = None
+        if self.on_swap is not None:
+            self.on_swap(self.current)
+        print(f"Models {previous} -> {version}", file=sys.stderr, flush=True)
+        return True
+
+    def poll(self):
+        fingerprint = model_fingerprint(self.artifacts_dir)
+        if fingerprint is None or fingerprint == self._loaded_fingerprint:
+            self._settling = None
+            return False
+        if fingerprint != self._settling:
+            # Changed since the last poll: the release may still be copying
+            # files, so load only once they have been stable for an interval
+            self._settling = fingerprint
+            return False
+        self._settling = None
+        return self.reload()
+
+    def start(self, interval):
+        """Poll for new model files every `interval` seconds in a daemon thread."""
+        if self._thread is not None or interval <= 0:
+            return
+
+        def watch():
+            while not self._stop.wait(interval):
+                try:
+                    self.poll()
+                except Exception as e:
+                    self.last_error = f"{type(e).__name__}: {e}"
+
+        self._thread = threading.Thread(target=watch, name="model-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        current = self.current
+        return {
+            "version": current.version,
+            "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(current.loaded_at)),
+            "swaps": self.swaps,
+            "watching": self._thread is not None,
+            "last_error": self.last_error,
+        }
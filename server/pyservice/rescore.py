@@ -0,0 +1,163 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from itertools import islice
+
+from records import ErrorResult
+from serialization import dumps, loads
+
+# Offline re-score of stored triages against the current models, e.g. after a
+# model release. Input is a TriageLog export (mongoexport JSONL or
+# --jsonArray); output is one JSON line per record, in input order.
+#
+# The parent imports predict (loading the artifacts) before forking the pool,
+# so workers share the model memory copy-on-write instead of each loading
+# their own copy. At most `processes * 2` chunks are in flight, which bounds
+# memory no matter how large the export is.
+
+predict = None
+
+
+def read_export(path):
+    """Records from a mongoexport file: JSON lines or one JSON array.
+
+    A JSON line that does not parse to an object is yielded as an
+    ErrorResult in its place, so the rest of the export is still scored.
+    """
+    with (sys.stdin if path == "-" else open(path, encoding="utf-8")) as f:
+        first = f.read(1)
+        while first.isspace():
+            first = f.read(1)
+        if first == "[":
+            # --jsonArray exports have to be parsed whole
+            yield from loads(first + f.read())
+            return
+        line = first + f.readline()
+        line_number = 1
+        while line:
+            if line.strip():
+                yield _parse_line(line, line_number)
+            line = f.readline()
+            line_number += 1
+
+
+def _parse_line(line, line_number):
+    try:
+        record = loads(line)
+    except ValueError as e:
+        return ErrorResult(f"Invalid record on line {line_number}: {e}")
+    if not isinstance(record, dict):
+        return ErrorResult(f"Invalid record on line {line_number}: expected an object")
+    return record
+
+
+def to_input(record):
+    symptoms = record.get("symptoms") or {}
+    # Older logs store [{name, urgencyScore}, ...] (see patientController)
+    if isinstance(symptoms, list):
+        symptoms = {s.get("name"): s.get("urgencyScore") for s in symptoms}
+    return {"symptoms": symptoms, "age": record.get("age"), "gender": record.get("gender")}
+
+
+def _stored_outcome(record):
+    predicted = record.get("predicted") or {}
+    return predicted.get("UrgencyCategory"), predicted.get("Remedy")
+
+
+def rescore_chunk(records):
+    """Output lines for one chunk plus its (errors, changed) counts.
+
+    Workers return ready-to-write text, which is much cheaper to send back to
+    the parent than the result dicts.
+    """
+    valid = [r for r in records if not isinstance(r, ErrorResult)]
+    scored = iter(predict.predict_batch([to_input(r) for r in valid]))
+    lines = []
+    errors = changed = 0
+    for record in records:
+        if isinstance(record, ErrorResult):
+            # Unreadable export line: an error row keeps the output in input order
+            errors += 1
+            lines.append(dumps({"_id": None, "spid": None, "result": record}) + "\n")
+            continue
+        result = next(scored)
+        row = {"_id": record.get("_id"), "spid": record.get("spid"), "result": result}
+        if "predicted" in record:
+            # The stored prediction, to compare outcomes between releases
+            row["previous"] = record["predicted"]
+            row["changed"] = result.error is None and (
+                (result.predicted.urgency_category, result.predicted.remedy) != _stored_outcome(record)
+            )
+            changed += row["changed"]
+        errors += result.error is not None
+        lines.append(dumps(row) + "\n")
+    return "".join(lines), len(records), errors, changed
+
+
+def chunked(records, size):
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def rescore(records, out, processes, chunk_size):
+    """Score records across `processes` workers and write them in order."""
+    summary = {"records": 0, "errors": 0, "changed": 0}
+
+    def write(scored):
+        text, records, errors, changed = scored
+        out.write(text)
+        summary["records"] += records
+        summary["errors"] += errors
+        summary["changed"] += changed
+
+    chunks = chunked(records, chunk_size)
+    if processes <= 1:
+        for chunk in chunks:
+            write(rescore_chunk(chunk))
+        return summary
+
+    with multiprocessing.get_context("fork").Pool(processes) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.apply_async(rescore_chunk, (chunk,)))
+            if len(pending) >= processes * 2:
+                write(pending.popleft().get())
+        while pending:
+            write(pending.popleft().get())
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-score exported triage logs with the current models")
+    parser.add_argument("input", help="mongoexport JSONL or JSON array file ('-' for stdin)")
+    parser.add_argument("-o", "--output", default="-", help="JSONL output file (default stdout)")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=512, help="records per task")
+    args = parser.parse_args()
+
+    if not hasattr(os, "fork"):
+        # Without fork every worker would reload the models; run in-process
+        args.processes = 1
+
+    import predict
+
+    start = time.perf_counter()
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        summary = rescore(read_export(args.input), out, args.processes, args.chunk_size)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - start
+    summary["seconds"] = round(elapsed, 3)
+    summary["records_per_s"] = round(summary["records"] / elapsed, 1) if elapsed else None
+    summary["processes"] = args.processes
+    print(json.dumps(summary), file=sys.stderr)
@@ -0,0 +1,179 @@
+import json
+import struct
+
+from records import ResultRecord, TriageResult, json_default
+
+# Encoding for everything predict.py reads and writes. orjson is used when it
+# is installed (several times faster, and it encodes NumPy values natively);
+# otherwise the standard library. Result records and NumPy scalars go through
+# records.json_default with either encoder.
+#
+# Triage results are assembled from byte fragments rather than encoded
+# whole: the dosage and composition parts are shared records encoded once
+# (see prerender), the rest of "predicted" is encoded once per urgency
+# category and remedy, so per result only the score is encoded. The output
+# is byte-for-byte what encoding to_dict() would give.
+#
+# Worker messages are framed either as JSON lines (the default) or, with
+# --framing msgpack, as msgpack maps behind a 4-byte big-endian length.
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+ENCODER = "orjson" if orjson is not None else "json"
+FRAMINGS = ("json", "msgpack")
+
+_LENGTH = struct.Struct(">I")
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY
+
+    def _encode(obj):
+        return orjson.dumps(obj, default=json_default, option=_ORJSON_OPTIONS)
+
+    loads = orjson.loads
+else:
+    def _encode(obj):
+        return json.dumps(obj, default=json_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    loads = json.loads
+
+# Encoded ends of "predicted" per (category, remedy) and of the result per
+# (fallback_used, model_version). Both sets are small; the cap only guards
+# against unbounded growth across many model reloads.
+_predicted_tails = {}
+_result_tails = {}
+MAX_TAILS = 4096
+
+
+def prerender(record):
+    """Store a shared details record's encoded JSON on it, for reuse by every
+    result that contains it. The record must not change afterwards."""
+    record.fragment = _encode(record)
+    return record
+
+
+def _remember(cache, key, value):
+    if len(cache) >= MAX_TAILS:
+        cache.clear()
+    cache[key] = value
+    return value
+
+
+def encode_result(result):
+    predicted = result.predicted
+    dosage = result.dosage
+    composition = result.composition
+    predicted_tail = _predicted_tails.get((predicted.urgency_category, predicted.remedy))
+    if predicted_tail is None:
+        predicted_tail = _remember(
+            _predicted_tails,
+            (predicted.urgency_category, predicted.remedy),
+            b',"UrgencyCategory":' + _encode(predicted.urgency_category)
+            + b',"Remedy":' + _encode(predicted.remedy) + b"}",
+        )
+    result_tail = _result_tails.get((result.fallback_used, result.model_version))
+    if result_tail is None:
+        result_tail = _remember(
+            _result_tails,
+            (result.fallback_used, result.model_version),
+            b',"fallbackUsed":' + _encode(result.fallback_used)
+            + b',"modelVersion":' + _encode(result.model_version),
+        )
+    parts = [
+        b'{"predicted":{"UrgencyScore":', _encode(predicted.urgency_score), predicted_tail,
+        b',"dosage":', dosage.fragment or _encode(dosage),
+        b',"composition":', composition.fragment or _encode(composition),
+        result_tail,
+    ]
+    if result.timings is not None:
+        parts += [b',"timings":', _encode(result.timings)]
+    parts.append(b"}")
+    return b"".join(parts)
+
+
+def dumps_bytes(obj):
+    """JSON bytes for obj. Triage results, alone, in a list, or as values of
+    a dict with string keys (worker and HTTP replies), go through
+    encode_result; everything else is encoded directly."""
+    if type(obj) is TriageResult:
+        return encode_result(obj)
+    if type(obj) is list:
+        if obj and isinstance(obj[0], ResultRecord):
+            return b"[" + b",".join([dumps_bytes(item) for item in obj]) + b"]"
+    elif type(obj) is dict:
+        if any(type(value) is TriageResult or type(value) is list for value in obj.values()) \
+                and all(type(key) is str for key in obj):
+            return b"{" + b",".join([_encode(key) + b":" + dumps_bytes(value) for key, value in obj.items()]) + b"}"
+    return _encode(obj)
+
+
+def dumps(obj):
+    return dumps_bytes(obj).decode("utf-8")
+
+
+def write_json_array(stream, items, chunk_size=256, end=b"\n"):
+    """Write items to a binary stream as one JSON array, a chunk at a time,
+    so a large batch is never held as a single string."""
+    stream.write(b"[")
+    buffer = []
+    first = True
+    for item in items:
+        buffer.append(dumps_bytes(item))
+        if len(buffer) >= chunk_size:
+            stream.write((b"" if first else b",") + b",".join(buffer))
+            first = False
+            buffer.clear()
+    if buffer:
+        stream.write((b"" if first else b",") + b",".join(buffer))
+    stream.write(b"]" + end)
+
+
+def require_framing(framing):
+    if framing not in FRAMINGS:
+        raise ValueError(f"Unknown framing: {framing}")
+    if framing == "msgpack" and msgpack is None:
+        raise RuntimeError("--framing msgpack needs the msgpack package (pip install msgpack)")
+
+
+def read_frames(stream, framing="json"):
+    """Raw message payloads from a binary stream until EOF."""
+    if framing == "json":
+        for line in stream:
+            line = line.strip()
+            if line:
+                yield line
+        return
+    while True:
+        header = stream.read(_LENGTH.size)
+        if len(header) < _LENGTH.size:
+            return
+        (length,) = _LENGTH.unpack(header)
+        payload = stream.read(length)
+        if len(payload) < length:
+            return
+        yield payload
+
+
+def decode_frame(payload, framing="json"):
+    """One message; raises ValueError for a malformed payload."""
+    if framing == "json":
+        return loads(payload)
+    try:
+        return msgpack.unpackb(payload, raw=False)
+    except Exception as e:
+        raise ValueError(str(e) or type(e).__name__) from e
+
+
+def encode_frame(message, framing="json"):
+    if framing == "json":
+        return dumps_bytes(message) + b"\n"
+    payload = msgpack.packb(message, default=json_default, use_bin_type=True)
+    return _LENGTH.pack(len(payload)) + payload
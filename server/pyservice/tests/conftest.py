@@ -0,0 +1,31 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# The service modules import each other by name (predict.py runs as a script),
+# so the tests put server/pyservice on the path the same way
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from artifacts import ARTIFACTS_DIR, SOURCE_FILES  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def raw_artifacts():
+    """Datasets and the stored scikit-learn models, read from the raw files."""
+    pytest.importorskip("sklearn")
+    missing = [rel.as_posix() for rel in SOURCE_FILES.values() if not (ARTIFACTS_DIR / rel).exists()]
+    if missing:
+        pytest.skip(f"artifacts not available: {', '.join(missing)}")
+    from artifacts import load_raw_artifacts
+
+    return load_raw_artifacts()
+
+
+@pytest.fixture(scope="session")
+def probe(raw_artifacts):
+    from ensemble import parity_probe
+
+    # Well over compiled_max_rows, so a predictor would hand it to scikit-learn
+    # whole; the tests below score compiled models directly or in small batches
+    return parity_probe(len(raw_artifacts["symptom_columns"]), n_random=1024, seed=7)
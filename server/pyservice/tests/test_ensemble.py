@@ -0,0 +1,84 @@
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from artifacts import ARTIFACTS_DIR, SOURCE_FILES, build_bundle, load_bundle
+from ensemble import MODEL_NAMES, CompiledModel, TriagePredictor, parity_report
+
+# Compiled trees must give exactly what the stored scikit-learn models give,
+# whichever way they are built or loaded.
+
+# As at runtime (see artifacts.py), models are fed plain arrays
+pytestmark = pytest.mark.filterwarnings("ignore:X does not have valid feature names")
+
+HERE = Path(__file__).resolve().parent.parent
+
+
+def model_input(artifacts, name, X):
+    columns = artifacts["model_columns"][name]
+    return X if columns is None else X[:, columns]
+
+
+@pytest.mark.parametrize("compact", [False, True])
+@pytest.mark.parametrize("name", MODEL_NAMES)
+def test_compiled_model_matches_stored_model(raw_artifacts, probe, name, compact):
+    model = raw_artifacts["models"][name]
+    X = model_input(raw_artifacts, name, probe)
+    compiled = CompiledModel(model, compact=compact)
+    np.testing.assert_array_equal(compiled.predict(X.astype(np.float32)), model.predict(X))
+
+
+@pytest.mark.parametrize("rows", [1, 2, 256, 257])
+def test_compiled_predictor_matches_uncompiled(raw_artifacts, probe, rows):
+    models, columns = raw_artifacts["models"], raw_artifacts["model_columns"]
+    compiled = TriagePredictor(models, columns, compile_trees=True)
+    assert sorted(compiled.compiled) == sorted(MODEL_NAMES)
+    for got, expected in zip(compiled.predict(probe[:rows]), TriagePredictor(models, columns).predict(probe[:rows])):
+        np.testing.assert_array_equal(got, expected)
+
+
+def test_parity_report_checks_compiled_trees(raw_artifacts, probe):
+    predictor = TriagePredictor(raw_artifacts["models"], raw_artifacts["model_columns"], compile_trees=True)
+    assert len(probe) > predictor.compiled_max_rows
+    assert parity_report(predictor, probe) == {name: 0 for name in MODEL_NAMES}
+    # A broken compiled model must show up even though the probe is larger
+    # than the batches the predictor sends to compiled trees
+    classes = predictor.compiled["clf_r"].classes
+    predictor.compiled["clf_r"].classes = np.roll(classes, 1)
+    assert parity_report(predictor, probe)["clf_r"] > 0
+
+
+@pytest.fixture(scope="module")
+def bundle_dir(raw_artifacts, tmp_path_factory):
+    # A copy, so the test does not replace the bundle in artifacts/
+    artifacts_dir = tmp_path_factory.mktemp("artifacts")
+    for rel in SOURCE_FILES.values():
+        if not rel.is_absolute():
+            (artifacts_dir / rel).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(ARTIFACTS_DIR / rel, artifacts_dir / rel)
+    build_bundle(artifacts_dir)
+    return artifacts_dir
+
+
+def test_bundled_models_match_stored_models(raw_artifacts, probe, bundle_dir):
+    bundle = load_bundle(bundle_dir)
+    for name in MODEL_NAMES:
+        compiled = bundle["models"][name]
+        assert isinstance(compiled, CompiledModel)
+        assert isinstance(compiled.flat.threshold, np.memmap)
+        X = model_input(raw_artifacts, name, probe)
+        np.testing.assert_array_equal(compiled.predict(X), raw_artifacts["models"][name].predict(X))
+
+
+def test_bundle_loads_without_sklearn(bundle_dir):
+    code = (
+        "import sys, artifacts\n"
+        f"artifacts.load_bundle({str(bundle_dir)!r})\n"
+        "print(sorted({'sklearn', 'pandas', 'joblib'} & set(sys.modules)))\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
@@ -0,0 +1,34 @@
+import os
+import signal
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+HERE = Path(__file__).resolve().parent.parent
+
+# SIGUSR2 lands on the main thread, which in worker mode also takes the
+# profiler lock (stats and profile ops); the handler must not wait on it there.
+SIGNAL_WHILE_LOCKED = """
+import os, signal, time
+import predict
+predict.start_background()
+with predict.profiler._lock:
+    os.kill(os.getpid(), signal.SIGUSR2)
+    time.sleep(0.1)
+deadline = time.time() + 10
+while predict.profiler.stats()["last"] is None and time.time() < deadline:
+    time.sleep(0.05)
+print(predict.profiler.stats()["last"]["samples"] > 0)
+"""
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGUSR2"), reason="no SIGUSR2 on this platform")
+def test_sigusr2_while_profiler_lock_is_held(raw_artifacts, tmp_path):
+    env = dict(os.environ, CAREMATE_PROFILE_SECONDS="0.05", CAREMATE_PROFILE_DIR=str(tmp_path),
+               CAREMATE_MODEL_WATCH_INTERVAL="0")
+    out = subprocess.run([sys.executable, "-c", SIGNAL_WHILE_LOCKED], cwd=HERE, env=env,
+                         capture_output=True, text=True, timeout=60, check=True)
+    assert out.stdout.strip() == "True"
+    assert len(list(tmp_path.glob("caremate-profile-*.folded"))) == 1
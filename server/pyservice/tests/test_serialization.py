@@ -0,0 +1,123 @@
+import json
+
+import numpy as np
+import pytest
+
+import serialization
+from records import CompositionDetails, DosageDetails, ErrorResult, Predicted, TriageResult, json_default
+from serialization import dumps_bytes, prerender
+
+# Results are assembled from cached byte fragments (see serialization.py);
+# the bytes must be exactly what encoding to_dict() gives.
+
+
+def reference(obj):
+    if serialization.orjson is not None:
+        return serialization.orjson.dumps(obj, default=json_default, option=serialization.orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, default=json_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def assert_encodes_like_to_dict(result):
+    assert dumps_bytes(result) == reference(result.to_dict())
+
+
+def triage_result(score=np.float64(0.73), category="Moderate", remedy="Belladonna", fallback=False,
+                  version="v1", render=True):
+    dosage = DosageDetails("30C", "2 pills", "Every 4 hours", "Adult", "F")
+    composition = CompositionDetails(remedy, "Deadly nightshade", "Atropine; \"scopolamine\"")
+    if render:
+        prerender(dosage)
+        prerender(composition)
+    return TriageResult(Predicted(score, category, remedy), dosage, composition, fallback, version)
+
+
+@pytest.mark.parametrize("score", [np.float64(0.73), np.float32(1.5), 2, 0.1 + 0.2, None])
+def test_model_result(score):
+    assert_encodes_like_to_dict(triage_result(score=score))
+
+
+def test_fallback_result():
+    assert_encodes_like_to_dict(triage_result(score=None, category=None, fallback=True))
+
+
+def test_details_without_fragments():
+    assert_encodes_like_to_dict(triage_result(render=False))
+
+
+def test_missing_details_and_unicode():
+    result = TriageResult(
+        Predicted(np.float64(1.0), "High", "Arnica montana — 200C"),
+        prerender(DosageDetails(None, "Dosage information not found.", None, "Senior", "OTHER")),
+        prerender(CompositionDetails("Arnica montana — 200C", None, None)),
+        False,
+        None,
+    )
+    assert_encodes_like_to_dict(result)
+
+
+def test_cached_tails_do_not_leak_between_results():
+    # Same category and remedy, different versions and fallback flags
+    for version, fallback in [("v1", False), ("v2", False), ("v1", True), (None, False)]:
+        assert_encodes_like_to_dict(triage_result(version=version, fallback=fallback))
+
+
+def test_timings():
+    timings = {"validate": 0.012, "predict": np.float64(1.25)}
+    assert_encodes_like_to_dict(triage_result().with_timings(timings))
+    assert_encodes_like_to_dict(ErrorResult("Invalid gender: X. Valid: M, F, Other").with_timings(timings))
+
+
+def test_error_result():
+    assert_encodes_like_to_dict(ErrorResult("Invalid symptoms: ['Sneezing']. Valid: ['Fever']"))
+
+
+def test_lists_and_replies():
+    results = [triage_result(), ErrorResult("No symptoms provided."), triage_result(fallback=True)]
+    expected = [r.to_dict() for r in results]
+    assert dumps_bytes(results) == reference(expected)
+    assert dumps_bytes({"id": 7, "results": results}) == reference({"id": 7, "results": expected})
+    assert dumps_bytes({"id": 7, "result": results[0]}) == reference({"id": 7, "result": expected[0]})
+    assert dumps_bytes({"id": 7, "ready": True}) == reference({"id": 7, "ready": True})
+
+
+@pytest.fixture(scope="module")
+def predict(raw_artifacts):
+    import predict
+
+    return predict
+
+
+def patient(*symptoms, age=40, gender="F"):
+    return {"symptoms": {name: 2 for name in symptoms}, "age": age, "gender": gender}
+
+
+def test_predicted_results(predict):
+    columns = predict.symptom_columns
+    inputs = [
+        patient(columns[0]),
+        patient(columns[1], age=8, gender="M"),
+        patient(*columns[:6], gender="Other"),
+        patient(*columns[3:10], age=70),
+        patient(),
+        patient(columns[0], gender="X"),
+    ]
+    results = predict.predict_batch(inputs)
+    assert [r.error is None for r in results] == [True, True, True, True, False, False]
+    assert results[0].fallback_used and not results[2].fallback_used
+    for result in results:
+        assert_encodes_like_to_dict(result)
+    # Cached on the second pass; the shared records encode the same way again
+    for result in predict.predict_batch(inputs):
+        assert_encodes_like_to_dict(result)
+
+
+def test_answer_table_results(predict):
+    if predict.answer_table is None:
+        pytest.skip("no answer table in artifacts/")
+    columns = predict.symptom_columns
+    hits = predict.answer_table.hits
+    results = predict.predict_batch([patient(columns[0], columns[1]), patient(columns[2], columns[4], age=15)])
+    assert predict.answer_table.hits == hits + 2
+    for result in results:
+        assert result.error is None and not result.fallback_used
+        assert_encodes_like_to_dict(result)
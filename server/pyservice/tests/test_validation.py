@@ -0,0 +1,120 @@
+import numpy as np
+import pytest
+
+from validation import InputValidator
+
+COLUMNS = ["Fever", "Cough", "Sore Throat", "Headache", "Fatigue"]
+
+
+@pytest.fixture
+def validator():
+    return InputValidator(COLUMNS)
+
+
+def valid_input(**overrides):
+    return {"symptoms": {"Fever": 2, "Cough": 1}, "age": 30, "gender": "F", **overrides}
+
+
+def baseline_row(symptoms):
+    # The encoding predict.py used before the validator: one severity per
+    # symptom, written at that symptom's column
+    column_index = {name: i for i, name in enumerate(COLUMNS)}
+    row = np.zeros(len(COLUMNS), dtype=np.int8)
+    for name, severity in symptoms.items():
+        row[column_index[name]] = severity
+    return row
+
+
+def errors_for(validator, input_data):
+    return validator.validate_batch([input_data]).errors[0]
+
+
+def test_valid_rows_match_baseline_encoding(validator):
+    symptoms = [
+        {"Fever": 2, "Cough": 1},
+        {"Headache": 3},
+        {"Fever": 0, "Sore Throat": 1, "Fatigue": 3},
+        {name: 3 for name in COLUMNS},
+        {},
+    ]
+    checked = validator.validate_batch([valid_input(symptoms=s) for s in symptoms])
+    assert checked.errors == [[] for _ in symptoms]
+    assert checked.matrix.dtype == np.int8
+    np.testing.assert_array_equal(checked.matrix, np.array([baseline_row(s) for s in symptoms]))
+    np.testing.assert_array_equal(checked.symptom_counts, [2, 1, 2, 5, 0])
+
+
+def test_names_and_genders_are_normalised(validator):
+    checked = validator.validate_batch([
+        valid_input(symptoms={" fever ": 2, "SORE THROAT": 1.0}, gender=" other "),
+        valid_input(gender="m"),
+    ])
+    assert checked.errors == [[], []]
+    np.testing.assert_array_equal(checked.matrix[0], baseline_row({"Fever": 2, "Sore Throat": 1}))
+    assert checked.genders == ["OTHER", "M"]
+
+
+@pytest.mark.parametrize("age, category", [(0, "Child"), (12, "Child"), (12.5, "Adolescent"),
+                                           (18, "Adolescent"), (60, "Adult"), (61, "Senior"), (120, "Senior")])
+def test_age_categories(validator, age, category):
+    checked = validator.validate_batch([valid_input(age=age)])
+    assert checked.errors == [[]]
+    assert checked.age_categories[0] == category
+
+
+def test_non_object_input(validator):
+    checked = validator.validate_batch(["Fever", None, valid_input()])
+    assert checked.errors[:2] == [["Invalid input: expected an object"]] * 2
+    assert checked.errors[2] == []
+    # Only the valid row reaches the matrix
+    np.testing.assert_array_equal(checked.matrix[:2], 0)
+    np.testing.assert_array_equal(checked.matrix[2], baseline_row({"Fever": 2, "Cough": 1}))
+
+
+@pytest.mark.parametrize("symptoms", [None, ["Fever"], "Fever"])
+def test_symptoms_must_be_an_object(validator, symptoms):
+    assert errors_for(validator, valid_input(symptoms=symptoms)) == [
+        "Invalid symptoms: expected an object of symptom: severity"
+    ]
+
+
+def test_unknown_symptom(validator):
+    assert errors_for(validator, valid_input(symptoms={"Fever": 2, "Sneezing": 1})) == [
+        f"Invalid symptoms: ['Sneezing']. Valid: {COLUMNS}"
+    ]
+
+
+def test_duplicate_symptom(validator):
+    assert errors_for(validator, valid_input(symptoms={"Fever": 2, "fever": 1})) == ["Duplicate symptom: fever"]
+
+
+@pytest.mark.parametrize("severity", [-1, 4, 1.5, True, "2", None])
+def test_bad_severity(validator, severity):
+    assert errors_for(validator, valid_input(symptoms={"Cough": severity})) == [
+        f"Invalid severity for Cough: {severity!r}. Expected a whole number 0-3"
+    ]
+
+
+@pytest.mark.parametrize("age", [-1, 121, "30", None, True])
+def test_out_of_range_age(validator, age):
+    assert errors_for(validator, valid_input(age=age)) == [f"Invalid age: {age!r}. Expected a number 0-120"]
+
+
+@pytest.mark.parametrize("gender, shown", [("X", "X"), ("female", "FEMALE"), (None, None), (1, 1)])
+def test_bad_gender(validator, gender, shown):
+    assert errors_for(validator, valid_input(gender=gender)) == [f"Invalid gender: {shown}. Valid: M, F, Other"]
+
+
+def test_errors_are_collected_per_row(validator):
+    checked = validator.validate_batch([
+        {"symptoms": {"Sneezing": 1, "Fever": 9}, "age": 200, "gender": "X"},
+        valid_input(),
+    ])
+    assert checked.errors[0] == [
+        f"Invalid symptoms: ['Sneezing']. Valid: {COLUMNS}",
+        "Invalid severity for Fever: 9. Expected a whole number 0-3",
+        "Invalid age: 200. Expected a number 0-120",
+        "Invalid gender: X. Valid: M, F, Other",
+    ]
+    assert checked.errors[1] == []
+    np.testing.assert_array_equal(checked.matrix[0], 0)
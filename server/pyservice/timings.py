@@ -0,0 +1,41 @@
+import time
+
+# Per-phase wall-clock timings for one request. Callers always call lap();
+# with timings switched off they get NULL_TIMER, whose lap() does nothing.
+
+
+class PhaseTimer:
+    """Accumulates monotonic time per phase, in milliseconds.
+
+    lap(phase) charges the time since the previous lap (or construction) to
+    phase, so calling it inside a loop sums that phase over all rows.
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self.phases = {}
+        self._started = self._last = time.perf_counter()
+
+    def lap(self, phase):
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + (now - self._last) * 1000
+        self._last = now
+
+    def as_dict(self):
+        timings = {phase: round(ms, 3) for phase, ms in self.phases.items()}
+        timings["total"] = round((self._last - self._started) * 1000, 3)
+        return timings
+
+
+class _NullTimer:
+    enabled = False
+
+    def lap(self, phase):
+        pass
+
+    def as_dict(self):
+        return None
+
+
+NULL_TIMER = _NullTimer()
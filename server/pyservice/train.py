@@ -0,0 +1,248 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from itertools import product
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+from artifacts import ARTIFACTS_DIR, LABEL_COLUMNS, MODEL_FILES, SOURCE_FILES, file_sha256
+
+# Training for the three models predict.py serves, from the training CSV.
+# The dataset is read once in the parent; a fork pool then runs every
+# (model, candidate, fold) fit of the hyperparameter search, and the three
+# final fits on the full data, across all cores. Workers read the data from
+# the parent copy-on-write. Fold splits are cached under
+# artifacts/train_cache keyed by the dataset hash, fold count and seed, so
+# reruns (and other searches over the same data) reuse them.
+#
+# The models are fit on DataFrames, so each records its column order in
+# feature_names_in_ (which inference follows, see artifacts.model_columns),
+# and symptom_schema.json is written next to them with that order, the
+# chosen parameters and their cross-validation scores.
+#
+#   python server/pyservice/train.py
+#   python server/pyservice/train.py --no-search --output-dir /tmp/models
+
+SCHEMA_FILE = Path("model") / "symptom_schema.json"
+CACHE_DIR = Path("train_cache")
+
+# Per model: target column, fold stratification and candidate parameters.
+# The first candidate is the configuration shipped so far, so --no-search
+# reproduces it and ties in the search go to the smaller model.
+SPECS = {
+    "clf_u": {
+        "target": "UrgencyCategoryEncoded",
+        "kind": "classifier",
+        "grid": {"n_estimators": [20, 50, 100], "max_depth": [None, 10], "min_samples_leaf": [1, 2]},
+    },
+    "reg": {
+        "target": "UrgencyScore",
+        "kind": "regressor",
+        "grid": {"n_estimators": [30, 60, 100], "learning_rate": [0.1, 0.05], "max_depth": [3, 2]},
+    },
+    "clf_r": {
+        "target": "Remedy",
+        "kind": "classifier",
+        "grid": {"n_estimators": [20, 50, 100], "max_depth": [None, 10], "min_samples_leaf": [1, 2]},
+    },
+}
+
+# Set in the parent before the pool forks; see load_dataset
+_data = None
+
+
+def candidates(grid):
+    names = list(grid)
+    return [dict(zip(names, values)) for values in product(*(grid[name] for name in names))]
+
+
+def make_estimator(name, params, seed):
+    from sklearn.ensemble import GradientBoostingRegressor, RandomForestClassifier
+
+    # One core per fit; the pool provides the parallelism
+    if SPECS[name]["kind"] == "regressor":
+        return GradientBoostingRegressor(random_state=seed, **params)
+    return RandomForestClassifier(random_state=seed, n_jobs=1, **params)
+
+
+def load_dataset(training_csv):
+    import pandas as pd
+
+    df = pd.read_csv(training_csv)
+    symptom_columns = df.drop(columns=LABEL_COLUMNS, errors="ignore").columns.tolist()
+    missing = [spec["target"] for spec in SPECS.values() if spec["target"] not in df.columns]
+    if missing:
+        raise ValueError(f"{training_csv} has no {missing} column")
+    return {
+        "symptom_columns": symptom_columns,
+        "X": df[symptom_columns],
+        "targets": {name: df[spec["target"]].to_numpy() for name, spec in SPECS.items()},
+    }
+
+
+def fold_splits(targets, n_folds, seed, sha256, cache_dir):
+    """Test-row indices per fold for each model, from the cache when possible.
+
+    Classifier folds are stratified on their own target.
+    """
+    from sklearn.model_selection import KFold, StratifiedKFold
+
+    path = Path(cache_dir) / f"folds-{sha256[:12]}-k{n_folds}-s{seed}.npz"
+    if path.exists():
+        with np.load(path) as cached:
+            return {name: [cached[f"{name}_{k}"] for k in range(n_folds)] for name in SPECS}, True
+
+    folds = {}
+    for name, spec in SPECS.items():
+        y = targets[name]
+        if spec["kind"] == "classifier":
+            splitter = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=seed)
+        else:
+            splitter = KFold(n_splits=n_folds, shuffle=True, random_state=seed)
+        folds[name] = [test for _, test in splitter.split(np.zeros((len(y), 1)), y)]
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.stem + ".tmp.npz")
+    np.savez(tmp_path, **{f"{name}_{k}": test for name, tests in folds.items() for k, test in enumerate(tests)})
+    tmp_path.replace(path)
+    return folds, False
+
+
+def score_fold(task):
+    """Cross-validation score of one candidate on one fold (higher is better)."""
+    from sklearn.metrics import balanced_accuracy_score, mean_squared_error
+
+    name, index, params, test, seed = task
+    X = _data["X"].to_numpy()
+    y = _data["targets"][name]
+    train = np.ones(len(y), dtype=bool)
+    train[test] = False
+    model = make_estimator(name, params, seed).fit(X[train], y[train])
+    predicted = model.predict(X[test])
+    if SPECS[name]["kind"] == "regressor":
+        score = -float(np.sqrt(mean_squared_error(y[test], predicted)))
+    else:
+        score = float(balanced_accuracy_score(y[test], predicted))
+    return name, index, score
+
+
+def fit_final(task):
+    # On the DataFrame, so the model keeps the training column names
+    name, params, seed = task
+    return name, make_estimator(name, params, seed).fit(_data["X"], _data["targets"][name])
+
+
+def search(folds, processes, seed, no_search=False):
+    """Best parameters per model and the mean fold score of every candidate."""
+    grids = {name: candidates(spec["grid"])[:1] if no_search else candidates(spec["grid"])
+             for name, spec in SPECS.items()}
+    tasks = [
+        (name, index, params, test, seed)
+        for name, grid in grids.items()
+        for index, params in enumerate(grid)
+        for test in folds[name]
+    ]
+    scores = {name: [[] for _ in grid] for name, grid in grids.items()}
+    for name, index, score in _map(score_fold, tasks, processes):
+        scores[name][index].append(score)
+
+    results = {}
+    for name, grid in grids.items():
+        means = [float(np.mean(s)) for s in scores[name]]
+        # First best wins, so ties go to the earlier (smaller) candidate
+        best = int(np.argmax(means))
+        results[name] = {
+            "params": grid[best],
+            "cv_score": means[best],
+            "metric": "neg_rmse" if SPECS[name]["kind"] == "regressor" else "balanced_accuracy",
+            "candidates": [{"params": params, "cv_score": mean} for params, mean in zip(grid, means)],
+        }
+    return results
+
+
+def _map(func, tasks, processes):
+    if processes <= 1:
+        return [func(task) for task in tasks]
+    with multiprocessing.get_context("fork").Pool(processes) as pool:
+        # Small chunks: fits differ a lot in cost across the grid
+        return pool.map(func, tasks, chunksize=1)
+
+
+def _dump(obj, path):
+    # Written under a temporary name and renamed, so a watching service
+    # (see registry.py) never loads a half-written file
+    tmp_path = path.with_name(path.name + ".tmp")
+    joblib.dump(obj, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def train(artifacts_dir=ARTIFACTS_DIR, output_dir=None, n_folds=5, seed=0, processes=None, no_search=False):
+    """Search, fit and write the three models plus symptom_schema.json.
+
+    Returns the schema that was written.
+    """
+    global _data
+
+    artifacts_dir = Path(artifacts_dir)
+    output_dir = Path(output_dir) if output_dir else artifacts_dir / SOURCE_FILES["clf_u"].parent
+    processes = processes or os.cpu_count() or 1
+    if not hasattr(os, "fork"):
+        processes = 1
+    training_csv = artifacts_dir / SOURCE_FILES["training"]
+
+    started = time.perf_counter()
+    sha256 = file_sha256(training_csv)
+    _data = load_dataset(training_csv)
+    folds, cached = fold_splits(_data["targets"], n_folds, seed, sha256, artifacts_dir / CACHE_DIR)
+    print(f"Loaded {len(_data['X'])} rows, {len(_data['symptom_columns'])} symptoms; "
+          f"{n_folds} folds {'from cache' if cached else 'cached'}", file=sys.stderr)
+
+    results = search(folds, processes, seed, no_search)
+    for name, result in results.items():
+        print(f"{name}: {result['params']} {result['metric']}={result['cv_score']:.4f} "
+              f"({len(result['candidates'])} candidates)", file=sys.stderr)
+
+    models = dict(_map(fit_final, [(name, results[name]["params"], seed) for name in SPECS], min(processes, 3)))
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for name in MODEL_FILES:
+        _dump(models[name], output_dir / SOURCE_FILES[name].name)
+
+    schema = {
+        "symptom_columns": _data["symptom_columns"],
+        "targets": {name: spec["target"] for name, spec in SPECS.items()},
+        "dataset_sha256": sha256,
+        "rows": len(_data["X"]),
+        "folds": n_folds,
+        "seed": seed,
+        "models": {
+            name: dict(results[name], file=SOURCE_FILES[name].name, estimator=type(models[name]).__name__)
+            for name in MODEL_FILES
+        },
+        "trained": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "seconds": round(time.perf_counter() - started, 1),
+    }
+    schema_path = output_dir / SCHEMA_FILE.name
+    schema_path.write_text(json.dumps(schema, indent=2))
+    _data = None
+    return schema
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the urgency, score and remedy models")
+    parser.add_argument("--artifacts-dir", default=str(ARTIFACTS_DIR))
+    parser.add_argument("--output-dir", help="where to write the models (default: the artifacts model directory)")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--no-search", action="store_true",
+                        help="fit the default parameters only (still cross-validated)")
+    args = parser.parse_args()
+
+    schema = train(args.artifacts_dir, args.output_dir, args.folds, args.seed, args.processes, args.no_search)
+    print(f"Wrote {', '.join(m['file'] for m in schema['models'].values())} and {SCHEMA_FILE.name} "
+          f"in {schema['seconds']}s")
@@ -0,0 +1,119 @@
+import numpy as np
+
+# Request validation for predict.py, compiled once from the symptom schema.
+# Symptom names match case-insensitively; severities must be whole numbers
+# 0-3, age a number 0-120 and gender M, F or Other. A batch is checked in one
+# pass over the inputs and the severities of valid rows are written straight
+# into the int8 matrix the models read.
+
+MAX_SEVERITY = 3
+MAX_AGE = 120
+GENDERS = ("M", "F", "OTHER")
+
+# Upper bounds (inclusive) of the age categories, in order
+AGE_LIMITS = np.array([12, 18, 60])
+AGE_CATEGORIES = np.array(["Child", "Adolescent", "Adult", "Senior"], dtype=object)
+
+
+class ValidatedBatch:
+    """Validation results for a list of inputs, one entry per input.
+
+    errors[i] lists what is wrong with input i (empty when it is valid).
+    matrix[i] holds its severities in symptom_columns order; rows of invalid
+    inputs are left at zero.
+    """
+
+    __slots__ = ("matrix", "errors", "age_categories", "genders", "symptom_counts")
+
+    def __init__(self, matrix, errors, age_categories, genders, symptom_counts):
+        self.matrix = matrix
+        self.errors = errors
+        self.age_categories = age_categories
+        self.genders = genders
+        self.symptom_counts = symptom_counts
+
+
+class InputValidator:
+    def __init__(self, symptom_columns):
+        self.symptom_columns = list(symptom_columns)
+        self.columns = {name.strip().lower(): i for i, name in enumerate(self.symptom_columns)}
+
+    def _severity(self, value):
+        # bool is an int subclass but not a severity
+        if type(value) is int:
+            return value if 0 <= value <= MAX_SEVERITY else None
+        if type(value) is float and value.is_integer() and 0 <= value <= MAX_SEVERITY:
+            return int(value)
+        return None
+
+    def _check_symptoms(self, symptoms, errors, columns, severities):
+        if not isinstance(symptoms, dict):
+            errors.append("Invalid symptoms: expected an object of symptom: severity")
+            return
+        unknown = []
+        seen = set()
+        for name, value in symptoms.items():
+            column = self.columns.get(name.strip().lower()) if isinstance(name, str) else None
+            if column is None:
+                unknown.append(name)
+                continue
+            if column in seen:
+                errors.append(f"Duplicate symptom: {name}")
+                continue
+            seen.add(column)
+            severity = self._severity(value)
+            if severity is None:
+                errors.append(f"Invalid severity for {self.symptom_columns[column]}: {value!r}. "
+                              f"Expected a whole number 0-{MAX_SEVERITY}")
+            elif severity:
+                columns.append(column)
+                severities.append(severity)
+        if unknown:
+            errors.insert(0, f"Invalid symptoms: {unknown}. Valid: {self.symptom_columns}")
+
+    def validate_batch(self, inputs):
+        n = len(inputs)
+        errors = [[] for _ in range(n)]
+        ages = np.zeros(n)
+        genders = [None] * n
+        # Non-zero severities of valid rows as (row, column, severity) triples,
+        # scattered into the matrix in one assignment at the end
+        rows, columns, severities = [], [], []
+
+        for i, input_data in enumerate(inputs):
+            row_errors = errors[i]
+            if not isinstance(input_data, dict):
+                row_errors.append("Invalid input: expected an object")
+                continue
+            row_columns = []
+            row_severities = []
+            self._check_symptoms(input_data.get("symptoms"), row_errors, row_columns, row_severities)
+
+            age = input_data.get("age")
+            if type(age) in (int, float) and 0 <= age <= MAX_AGE:
+                ages[i] = age
+            else:
+                row_errors.append(f"Invalid age: {age!r}. Expected a number 0-{MAX_AGE}")
+
+            gender = input_data.get("gender")
+            gender = gender.strip().upper() if isinstance(gender, str) else gender
+            if gender in GENDERS:
+                genders[i] = gender
+            else:
+                row_errors.append(f"Invalid gender: {gender}. Valid: M, F, Other")
+
+            if not row_errors:
+                rows.extend([i] * len(row_columns))
+                columns.extend(row_columns)
+                severities.extend(row_severities)
+
+        matrix = np.zeros((n, len(self.symptom_columns)), dtype=np.int8)
+        if rows:
+            matrix[rows, columns] = severities
+        return ValidatedBatch(
+            matrix,
+            errors,
+            AGE_CATEGORIES[AGE_LIMITS.searchsorted(ages)],
+            genders,
+            np.count_nonzero(matrix, axis=1),
+        )
@@ -5,5 +5,16 @@ export const env = {
   OPENAI_API_KEY: process.env.OPENAI_API_KEY || '',
   GEMINI_API_KEY: process.env.GEMINI_API_KEY || '',
   OPENAI_MODEL: process.env.OPENAI_MODEL || 'gpt-4o-mini',
-  ALLOW_ORIGIN: process.env.ALLOW_ORIGIN || 'http://localhost:5173'
+  ALLOW_ORIGIN: process.env.ALLOW_ORIGIN || 'http://localhost:5173',
+  PYTHON_BIN: process.env.PYTHON_BIN || 'python',
+  // Warm predict.py workers; 0 falls back to one process per request
+  PREDICT_WORKERS: process.env.PREDICT_WORKERS ? Number(process.env.PREDICT_WORKERS) : 2,
+  PREDICT_TIMEOUT_MS: process.env.PREDICT_TIMEOUT_MS ? Number(process.env.PREDICT_TIMEOUT_MS) : 30000,
+  // URL of a running `predict.py --http` service; takes precedence over workers
+  PREDICT_URL: process.env.PREDICT_URL || '',
+  PREDICT_HEALTH_INTERVAL_MS: process.env.PREDICT_HEALTH_INTERVAL_MS ? Number(process.env.PREDICT_HEALTH_INTERVAL_MS) : 15000,
+  // 'msgpack' frames worker messages as msgpack (needs @msgpack/msgpack)
+  PREDICT_FRAMING: process.env.PREDICT_FRAMING === 'msgpack' ? 'msgpack' as const : 'json' as const,
+  // Record per-phase prediction timings on each TriageLog
+  PREDICT_TIMINGS: process.env.PREDICT_TIMINGS === '1'
 };
@@ -0,0 +1,363 @@
+import 'dotenv/config';
+import { spawn, type ChildProcess } from 'child_process';
+import fs from 'fs';
+import os from 'os';
+import { once } from 'events';
+import type { AddressInfo } from 'net';
+import { fileURLToPath } from 'url';
+import { dirname, join } from 'path';
+import { parseArgs } from 'util';
+import { loadSymptomRows, TRAINING_CSV, Workload, type TriageBody } from './workload';
+import { processSnapshot } from './procstat';
+
+// End-to-end load test of the triage path: POST /api/triage (or scoreTriage
+// directly with --entry score) through whichever prediction backend --mode
+// selects, with MongoDB and the LLM replaced by in-process stand-ins (see
+// standins.ts). Load rises step by step, either as closed-loop concurrency
+// or as open-loop Poisson arrival rates, and each step reports throughput,
+// latency percentiles, errors, live Python processes and CPU, then the step
+// where the path saturated.
+//
+//   npm run loadtest -- --mode oneshot --concurrency 1,2,4,8
+//   npm run loadtest -- --mode workers --workers 4 --rate 20,40,80 --concurrency 64
+//   npm run loadtest -- --mode http --output load.json
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = dirname(__filename);
+
+const PREDICT_SCRIPT = join(__dirname, '../../pyservice/predict.py');
+
+// predict.py --http started for this run, if any; stopped on exit
+let service: ChildProcess | null = null;
+
+type Step = { concurrency: number; rate: number | null };
+
+type StepResult = Step & {
+  requests: number;
+  ok: number;
+  errors: number;
+  shed: number;
+  errorRate: number;
+  throughput: number;
+  // Successful requests only
+  latencyMs: { mean: number; p50: number; p90: number; p95: number; p99: number; max: number } | null;
+  processes: { mean: number; max: number } | null;
+  cpu: { nodeMs: number; childMs: number | null; utilization: number | null };
+  errorSamples: Record<string, number>;
+};
+
+const { values: args } = parseArgs({
+  options: {
+    mode: { type: 'string', default: 'workers' },
+    entry: { type: 'string', default: 'route' },
+    concurrency: { type: 'string', default: '1,2,4,8,16' },
+    rate: { type: 'string' },
+    duration: { type: 'string', default: '10' },
+    warmup: { type: 'string', default: '2' },
+    workers: { type: 'string', default: process.env.PREDICT_WORKERS || '2' },
+    url: { type: 'string' },
+    'http-port': { type: 'string', default: '8799' },
+    'http-processes': { type: 'string', default: '0' },
+    'db-latency-ms': { type: 'string', default: '2' },
+    'llm-latency-ms': { type: 'string', default: '0' },
+    patients: { type: 'string', default: '500' },
+    seed: { type: 'string', default: '1' },
+    'max-error-rate': { type: 'string', default: '0.01' },
+    'slo-p95-ms': { type: 'string' },
+    output: { type: 'string' }
+  }
+});
+
+function numbers(list: string): number[] {
+  return list.split(',').map(s => Number(s.trim())).filter(n => Number.isFinite(n) && n > 0);
+}
+
+function planSteps(): Step[] {
+  const concurrency = numbers(args.concurrency!);
+  if (!concurrency.length) throw new Error('--concurrency needs at least one positive number');
+  if (args.rate === undefined) return concurrency.map(c => ({ concurrency: c, rate: null }));
+  // Open loop: the rates rise, and concurrency caps requests in flight
+  const rates = numbers(args.rate);
+  if (concurrency.length > 1) throw new Error('with --rate, give a single --concurrency (the in-flight cap)');
+  return rates.map(rate => ({ concurrency: concurrency[0], rate }));
+}
+
+function sleep(ms: number): Promise<void> {
+  return new Promise(resolve => setTimeout(resolve, ms));
+}
+
+function percentile(sorted: number[], p: number): number {
+  return sorted[Math.min(sorted.length - 1, Math.ceil((p / 100) * sorted.length) - 1)];
+}
+
+function round(value: number, digits = 1): number {
+  const scale = 10 ** digits;
+  return Math.round(value * scale) / scale;
+}
+
+async function startPredictService(port: number, processes: number): Promise<{ url: string; child: ChildProcess }> {
+  const child = spawn(process.env.PYTHON_BIN || 'python',
+    [PREDICT_SCRIPT, '--http', '--port', String(port), '--processes', String(processes)],
+    { stdio: ['ignore', 'ignore', 'inherit'] });
+  const url = `http://127.0.0.1:${port}`;
+  const deadline = Date.now() + 60_000;
+  while (Date.now() < deadline) {
+    if (child.exitCode !== null) throw new Error(`predict.py --http exited with code ${child.exitCode}`);
+    try {
+      const res = await fetch(`${url}/health`);
+      if (res.ok) return { url, child };
+    } catch {
+      // Not listening yet
+    }
+    await sleep(200);
+  }
+  child.kill();
+  throw new Error(`predict.py --http did not become healthy on port ${port}`);
+}
+
+async function runStep(step: Step, durationMs: number, send: (body: TriageBody) => Promise<void>,
+                       workload: Workload): Promise<StepResult> {
+  const latencies: number[] = [];
+  const errorSamples: Record<string, number> = {};
+  let requests = 0;
+  let errors = 0;
+  let shed = 0;
+
+  const processCounts: number[] = [];
+  const sampler = setInterval(() => {
+    const snapshot = processSnapshot();
+    if (snapshot) processCounts.push(snapshot.processes);
+  }, 250);
+  const cpuStart = process.cpuUsage();
+  const procStart = processSnapshot();
+  const started = performance.now();
+  const end = started + durationMs;
+
+  const one = async () => {
+    const body = workload.next();
+    requests++;
+    const t0 = performance.now();
+    try {
+      await send(body);
+      latencies.push(performance.now() - t0);
+    } catch (error) {
+      errors++;
+      const msg = (error instanceof Error ? error.message : String(error)).slice(0, 120);
+      errorSamples[msg] = (errorSamples[msg] ?? 0) + 1;
+    }
+  };
+
+  if (step.rate === null) {
+    await Promise.all(Array.from({ length: step.concurrency }, async () => {
+      while (performance.now() < end) await one();
+    }));
+  } else {
+    const inFlight = new Set<Promise<void>>();
+    let arrival = started;
+    for (;;) {
+      arrival += workload.nextArrivalGapMs(step.rate);
+      if (arrival >= end) break;
+      const wait = arrival - performance.now();
+      if (wait > 0) await sleep(wait);
+      if (inFlight.size >= step.concurrency) {
+        // Past the in-flight cap the request is dropped, as a saturated
+        // server would time it out
+        requests++;
+        shed++;
+        continue;
+      }
+      const request: Promise<void> = one().finally(() => inFlight.delete(request));
+      inFlight.add(request);
+    }
+    await Promise.all(inFlight);
+  }
+
+  const elapsedMs = performance.now() - started;
+  clearInterval(sampler);
+  const cpu = process.cpuUsage(cpuStart);
+  const procEnd = processSnapshot();
+  const nodeMs = (cpu.user + cpu.system) / 1000;
+  const childMs = procStart && procEnd ? procEnd.childCpuMs - procStart.childCpuMs : null;
+
+  latencies.sort((a, b) => a - b);
+  const ok = latencies.length;
+  return {
+    ...step,
+    requests,
+    ok,
+    errors,
+    shed,
+    errorRate: requests ? (errors + shed) / requests : 0,
+    throughput: ok / (elapsedMs / 1000),
+    latencyMs: ok ? {
+      mean: latencies.reduce((sum, x) => sum + x, 0) / ok,
+      p50: percentile(latencies, 50),
+      p90: percentile(latencies, 90),
+      p95: percentile(latencies, 95),
+      p99: percentile(latencies, 99),
+      max: latencies[ok - 1]
+    } : null,
+    processes: processCounts.length ? {
+      mean: processCounts.reduce((sum, x) => sum + x, 0) / processCounts.length,
+      max: Math.max(...processCounts)
+    } : null,
+    cpu: {
+      nodeMs,
+      childMs,
+      utilization: childMs === null ? null : (nodeMs + childMs) / (elapsedMs * os.cpus().length)
+    },
+    errorSamples
+  };
+}
+
+// First step at which more load stopped buying throughput or broke a limit
+function findSaturation(results: StepResult[], maxErrorRate: number, sloP95Ms: number | null) {
+  let best = 0;
+  for (const [i, r] of results.entries()) {
+    let reason: string | null = null;
+    if (r.errorRate > maxErrorRate) {
+      reason = `error rate ${round(r.errorRate * 100)}% > ${round(maxErrorRate * 100)}%`;
+    } else if (sloP95Ms !== null && r.latencyMs && r.latencyMs.p95 > sloP95Ms) {
+      reason = `p95 ${round(r.latencyMs.p95)}ms > ${sloP95Ms}ms`;
+    } else if (r.rate !== null && r.throughput < 0.95 * r.rate) {
+      reason = `served ${round(r.throughput)}/s of ${r.rate}/s offered`;
+    } else if (r.rate === null && i > 0 && r.throughput < best * 1.05) {
+      reason = `throughput stopped rising (${round(best)}/s -> ${round(r.throughput)}/s)`;
+    }
+    if (reason) return { step: i, concurrency: r.concurrency, rate: r.rate, reason };
+    best = Math.max(best, r.throughput);
+  }
+  return null;
+}
+
+function printStep(r: StepResult) {
+  const load = r.rate === null ? `c=${r.concurrency}` : `${r.rate}/s (cap ${r.concurrency})`;
+  const lat = r.latencyMs;
+  const cells = [
+    load.padEnd(16),
+    String(r.requests).padStart(7),
+    round(r.throughput).toFixed(1).padStart(8),
+    (lat ? round(lat.p50).toFixed(1) : '-').padStart(8),
+    (lat ? round(lat.p95).toFixed(1) : '-').padStart(8),
+    (lat ? round(lat.p99).toFixed(1) : '-').padStart(8),
+    (round(r.errorRate * 100, 2).toFixed(2) + '%').padStart(7),
+    (r.processes ? `${round(r.processes.mean)}/${r.processes.max}` : '-').padStart(9),
+    (r.cpu.utilization === null ? '-' : round(r.cpu.utilization * 100) + '%').padStart(6)
+  ];
+  console.log(cells.join(' '));
+}
+
+async function main() {
+  const mode = args.mode!;
+  if (!['oneshot', 'workers', 'http'].includes(mode)) throw new Error(`Unknown --mode ${mode}`);
+  if (!['route', 'score'].includes(args.entry!)) throw new Error(`Unknown --entry ${args.entry}`);
+  const steps = planSteps();
+
+  // The backend is chosen from the environment when triageEngine loads, so
+  // everything that imports env.ts is loaded only after this point
+  process.env.PREDICT_URL = '';
+  process.env.PREDICT_WORKERS = mode === 'workers' ? args.workers! : '0';
+  if (mode === 'http') {
+    if (args.url) {
+      process.env.PREDICT_URL = args.url;
+    } else {
+      const started = await startPredictService(Number(args['http-port']), Number(args['http-processes']));
+      service = started.child;
+      process.env.PREDICT_URL = started.url;
+    }
+  }
+
+  const { installStandIns } = await import('./standins');
+  const counts = installStandIns({
+    dbLatencyMs: Number(args['db-latency-ms']),
+    llmLatencyMs: Number(args['llm-latency-ms'])
+  });
+  const { scoreTriage } = await import('../services/triageEngine');
+
+  let send: (body: TriageBody) => Promise<void>;
+  let server: import('http').Server | null = null;
+  if (args.entry === 'route') {
+    const { default: express } = await import('express');
+    const { triageRouter } = await import('../routes/triage');
+    const app = express();
+    app.use(express.json());
+    app.use('/api/triage', triageRouter);
+    server = app.listen(0, '127.0.0.1');
+    await once(server, 'listening');
+    const url = `http://127.0.0.1:${(server.address() as AddressInfo).port}/api/triage`;
+    send = async (body) => {
+      const res = await fetch(url, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(body)
+      });
+      const reply: any = await res.json();
+      if (!res.ok) {
+        const error = typeof reply?.error === 'string' ? reply.error : JSON.stringify(reply?.error);
+        throw new Error(`${res.status}: ${error}`);
+      }
+    };
+  } else {
+    send = async ({ symptoms, age, gender }) => {
+      await scoreTriage({ symptoms, age, gender });
+    };
+  }
+
+  const workload = new Workload(loadSymptomRows(TRAINING_CSV), Number(args.patients), Number(args.seed));
+  const durationMs = Number(args.duration) * 1000;
+  const meta = {
+    timestamp: new Date().toISOString(),
+    mode,
+    entry: args.entry,
+    workers: mode === 'workers' ? Number(args.workers) : null,
+    predictUrl: process.env.PREDICT_URL || null,
+    framing: process.env.PREDICT_FRAMING || 'json',
+    cores: os.cpus().length,
+    node: process.version,
+    durationS: Number(args.duration),
+    dbLatencyMs: Number(args['db-latency-ms']),
+    llmLatencyMs: Number(args['llm-latency-ms']),
+    seed: Number(args.seed)
+  };
+  console.log(`Load test: ${mode} mode via ${args.entry}, ${meta.cores} cores, ${args.duration}s per step`);
+
+  if (Number(args.warmup) > 0) {
+    // Starts workers and fills caches; not reported
+    await runStep({ concurrency: steps[0].concurrency, rate: null }, Number(args.warmup) * 1000, send, workload);
+  }
+
+  console.log(['load'.padEnd(16), 'reqs'.padStart(7), 'ok/s'.padStart(8), 'p50 ms'.padStart(8),
+    'p95 ms'.padStart(8), 'p99 ms'.padStart(8), 'errors'.padStart(7), 'procs'.padStart(9),
+    'cpu'.padStart(6)].join(' '));
+  const results: StepResult[] = [];
+  for (const step of steps) {
+    const result = await runStep(step, durationMs, send, workload);
+    results.push(result);
+    printStep(result);
+  }
+
+  const saturation = findSaturation(results, Number(args['max-error-rate']),
+    args['slo-p95-ms'] !== undefined ? Number(args['slo-p95-ms']) : null);
+  console.log(saturation
+    ? `Saturated at step ${saturation.step + 1} (${saturation.rate === null ? `concurrency ${saturation.concurrency}` : `${saturation.rate}/s`}): ${saturation.reason}`
+    : 'No saturation within the tested load; raise --concurrency or --rate');
+  for (const [i, r] of results.entries()) {
+    for (const [msg, n] of Object.entries(r.errorSamples)) console.log(`  step ${i + 1}: ${n}x ${msg}`);
+  }
+
+  if (args.output) {
+    fs.writeFileSync(args.output, JSON.stringify({ meta, standIns: counts, steps: results, saturation }, null, 2));
+    console.log(`Report written to ${args.output}`);
+  }
+
+  server?.close();
+  service?.kill();
+  // Pool workers exit when their stdin closes with this process
+  process.exit(0);
+}
+
+main().catch((error) => {
+  console.error(error instanceof Error ? error.message : error);
+  service?.kill();
+  process.exit(1);
+});
@@ -0,0 +1,64 @@
+import fs from 'fs';
+
+// CPU time and process counts for this Node process and everything it has
+// spawned, read from /proc. Off Linux, processSnapshot returns null and the
+// report leaves those columns empty.
+
+// USER_HZ, the unit of the /proc/<pid>/stat times; 100 on every Linux port
+const TICKS_PER_SECOND = 100;
+
+type ProcStat = { ppid: number; ownTicks: number; childTicks: number };
+
+function readStat(pid: number | 'self'): ProcStat | null {
+  let text: string;
+  try {
+    text = fs.readFileSync(`/proc/${pid}/stat`, 'utf-8');
+  } catch {
+    return null;
+  }
+  // The command name may contain spaces; fields after it are space-separated,
+  // starting with field 3 (state)
+  const fields = text.slice(text.lastIndexOf(')') + 2).split(' ');
+  return {
+    ppid: Number(fields[1]),
+    ownTicks: Number(fields[11]) + Number(fields[12]),
+    childTicks: Number(fields[13]) + Number(fields[14])
+  };
+}
+
+export type ProcessSnapshot = {
+  // Live descendants (predict.py workers or one-shot processes, HTTP service)
+  processes: number;
+  // CPU ms used by descendants, live and exited, since this process started
+  childCpuMs: number;
+};
+
+export function processSnapshot(): ProcessSnapshot | null {
+  const self = readStat('self');
+  if (!self) return null;
+  const stats = new Map<number, ProcStat>();
+  for (const entry of fs.readdirSync('/proc')) {
+    if (!/^\d+$/.test(entry)) continue;
+    const stat = readStat(Number(entry));
+    if (stat) stats.set(Number(entry), stat);
+  }
+  const children = new Map<number, number[]>();
+  for (const [pid, stat] of stats) {
+    const siblings = children.get(stat.ppid);
+    if (siblings) siblings.push(pid);
+    else children.set(stat.ppid, [pid]);
+  }
+
+  // Exited children that were reaped are already in our own child times
+  let ticks = self.childTicks;
+  let processes = 0;
+  const pending = [...(children.get(process.pid) ?? [])];
+  while (pending.length) {
+    const pid = pending.pop()!;
+    const stat = stats.get(pid)!;
+    processes++;
+    ticks += stat.ownTicks + stat.childTicks;
+    pending.push(...(children.get(pid) ?? []));
+  }
+  return { processes, childCpuMs: (ticks / TICKS_PER_SECOND) * 1000 };
+}
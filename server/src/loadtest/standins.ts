@@ -0,0 +1,79 @@
+import { Types } from 'mongoose';
+import { Patient } from '../models/Patient';
+import { TriageLog } from '../models/TriageLog';
+import { explanationService } from '../services/explanationService';
+
+// In-process stand-ins for MongoDB and the LLM explanation call, so a load
+// test exercises the triage route and the Python scoring path without either
+// service. The calls the route makes (Patient.findOne/create/updateOne and
+// TriageLog.create) are replaced on the models with an in-memory store, and
+// generateExplanation returns canned text. Each call waits a random delay
+// with the configured mean (uniform between 0.5x and 1.5x) to stand in for
+// the network round trip; 0 answers immediately.
+
+export type StandInOptions = {
+  dbLatencyMs: number;
+  llmLatencyMs: number;
+};
+
+export type StandInCounts = {
+  patientLookups: number;
+  patientsCreated: number;
+  logsCreated: number;
+  explanations: number;
+};
+
+function delay(meanMs: number): Promise<void> {
+  if (meanMs <= 0) return Promise.resolve();
+  return new Promise(resolve => setTimeout(resolve, meanMs * (0.5 + Math.random())));
+}
+
+export function installStandIns(options: StandInOptions): StandInCounts {
+  const counts: StandInCounts = { patientLookups: 0, patientsCreated: 0, logsCreated: 0, explanations: 0 };
+  const patients = new Map<string, { _id: Types.ObjectId; spid: string; triageLogs: Types.ObjectId[] }>();
+  const byId = new Map<string, { triageLogs: Types.ObjectId[] }>();
+
+  const patientModel = Patient as any;
+  patientModel.findOne = async (filter: { spid: string }) => {
+    await delay(options.dbLatencyMs);
+    counts.patientLookups++;
+    return patients.get(filter.spid) ?? null;
+  };
+  patientModel.create = async (doc: { spid: string }) => {
+    await delay(options.dbLatencyMs);
+    // Two requests for a new SPID can both miss findOne; keep the first, as
+    // the unique index would
+    const existing = patients.get(doc.spid);
+    if (existing) return existing;
+    const patient = { _id: new Types.ObjectId(), spid: doc.spid, triageLogs: [] };
+    patients.set(doc.spid, patient);
+    byId.set(patient._id.toString(), patient);
+    counts.patientsCreated++;
+    return patient;
+  };
+  patientModel.updateOne = async (filter: { _id: Types.ObjectId }, update: any) => {
+    await delay(options.dbLatencyMs);
+    const logId = update?.$addToSet?.triageLogs;
+    const patient = byId.get(String(filter._id));
+    if (patient && logId) patient.triageLogs.push(logId);
+    return { acknowledged: true, modifiedCount: patient ? 1 : 0 };
+  };
+
+  (TriageLog as any).create = async (doc: Record<string, any>) => {
+    await delay(options.dbLatencyMs);
+    counts.logsCreated++;
+    // Serialize as the driver would, but keep nothing: a long run would
+    // otherwise grow the heap it is measuring
+    JSON.stringify(doc);
+    return { _id: new Types.ObjectId(), ...doc };
+  };
+
+  explanationService.generateExplanation = async (symptoms, urgencyScore, urgencyCategory, remedy) => {
+    await delay(options.llmLatencyMs);
+    counts.explanations++;
+    return `Stand-in explanation: ${Object.keys(symptoms).length} symptoms, ${urgencyCategory} urgency `
+      + `(score ${urgencyScore}), suggested remedy ${remedy}.`;
+  };
+
+  return counts;
+}
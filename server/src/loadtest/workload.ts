@@ -0,0 +1,118 @@
+import fs from 'fs';
+import path from 'path';
+
+// Request bodies for the load test. Symptoms are taken row by row from the
+// training data, so the number of symptoms per request, which ones occur
+// together and their severities match what the models were fit on. Age and
+// gender are drawn from fixed clinic-like weights, and SPIDs from a bounded
+// pool so the patient lookup sees both new and returning patients.
+
+export type TriageBody = {
+  spid: string;
+  symptoms: Record<string, number>;
+  age: number;
+  gender: string;
+};
+
+export const TRAINING_CSV = path.join(process.cwd(), '..', 'artifacts', 'data', 'Balanced_SPID_Dataset.csv');
+
+const LABEL_COLUMNS = ['SPID', 'Remedy', 'UrgencyScore', 'UrgencyCategory', 'UrgencyCategoryEncoded', 'Condition'];
+
+// [min age, max age, weight]
+const AGE_BANDS: [number, number, number][] = [[1, 12, 0.15], [13, 18, 0.1], [19, 60, 0.55], [61, 90, 0.2]];
+const GENDERS: [string, number][] = [['M', 0.48], ['F', 0.48], ['Other', 0.04]];
+
+// Small seeded PRNG (mulberry32) so runs with the same --seed send the same requests
+export function seededRandom(seed: number): () => number {
+  let state = seed >>> 0;
+  return () => {
+    state = (state + 0x6d2b79f5) >>> 0;
+    let t = state;
+    t = Math.imul(t ^ (t >>> 15), t | 1);
+    t ^= t + Math.imul(t ^ (t >>> 7), t | 61);
+    return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+  };
+}
+
+function splitCsvLine(line: string): string[] {
+  const cells: string[] = [];
+  let cell = '';
+  let quoted = false;
+  for (let i = 0; i < line.length; i++) {
+    const ch = line[i];
+    if (quoted) {
+      if (ch === '"' && line[i + 1] === '"') {
+        cell += '"';
+        i++;
+      } else if (ch === '"') {
+        quoted = false;
+      } else {
+        cell += ch;
+      }
+    } else if (ch === '"') {
+      quoted = true;
+    } else if (ch === ',') {
+      cells.push(cell);
+      cell = '';
+    } else {
+      cell += ch;
+    }
+  }
+  cells.push(cell);
+  return cells;
+}
+
+// The non-zero symptoms of every training row that has any
+export function loadSymptomRows(csvPath = TRAINING_CSV): Record<string, number>[] {
+  const lines = fs.readFileSync(csvPath, 'utf-8').split(/\r?\n/).filter(line => line.trim());
+  const header = splitCsvLine(lines[0] ?? '').map(h => h.trim());
+  const columns = header
+    .map((name, index) => ({ name, index }))
+    .filter(({ name }) => !LABEL_COLUMNS.includes(name));
+  const rows: Record<string, number>[] = [];
+  for (const line of lines.slice(1)) {
+    const cells = splitCsvLine(line);
+    const symptoms: Record<string, number> = {};
+    for (const { name, index } of columns) {
+      const severity = Number(cells[index]);
+      if (severity > 0) symptoms[name] = severity;
+    }
+    if (Object.keys(symptoms).length) rows.push(symptoms);
+  }
+  if (!rows.length) throw new Error(`No symptom rows in ${csvPath}`);
+  return rows;
+}
+
+function weighted<T>(random: () => number, choices: [T, number][]): T {
+  let r = random() * choices.reduce((sum, [, weight]) => sum + weight, 0);
+  for (const [value, weight] of choices) {
+    r -= weight;
+    if (r < 0) return value;
+  }
+  return choices[choices.length - 1][0];
+}
+
+export class Workload {
+  private random: () => number;
+
+  constructor(private rows: Record<string, number>[], private patients: number, seed: number) {
+    this.random = seededRandom(seed);
+  }
+
+  next(): TriageBody {
+    const symptoms = this.rows[Math.floor(this.random() * this.rows.length)];
+    const [minAge, maxAge] = weighted(this.random, AGE_BANDS.map(([lo, hi, w]) => [[lo, hi], w] as [[number, number], number]));
+    const patient = Math.floor(this.random() * this.patients);
+    return {
+      spid: `SPID${String(patient).padStart(4, '0')}`,
+      symptoms: { ...symptoms },
+      age: minAge + Math.floor(this.random() * (maxAge - minAge + 1)),
+      gender: weighted(this.random, GENDERS)
+    };
+  }
+
+  // Exponential gap (ms) to the next arrival of a Poisson process at `rate`/s
+  nextArrivalGapMs(rate: number): number {
+    return (-Math.log(1 - this.random()) / rate) * 1000;
+  }
+}
@@ -33,6 +33,10 @@ const TriageLogSchema = new Schema(
       'Chemical Composition': String
     },
     fallbackUsed: Boolean,
+    // Which model release scored this triage (see pyservice/registry.py)
+    modelVersion: String,
+    // Per-phase prediction timings in ms (PREDICT_TIMINGS=1 only)
+    timings: { type: Schema.Types.Mixed },
     notes: String,
     emotion: String,
     explanation: String // AI-generated patient-friendly explanation
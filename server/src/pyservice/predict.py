@@ -2,154 +2,104 @@ import sys
 import json
 from pathlib import Path
 
-import pandas as pd
-import joblib
-
-
-def load_artifacts():
-    # This file lives at server/src/pyservice/predict.py
-    # Repo root is three levels up from here
-    repo_root = Path(__file__).resolve().parents[3]
-    artifacts_dir = repo_root / 'artifacts'
-    data_dir = artifacts_dir / 'data'
-    model_dir = artifacts_dir / 'model'
-
-    # Data files
-    balanced_csv = data_dir / 'Balanced_SPID_Dataset.csv'
-    composition_csv = data_dir / 'Remedy_Composition_FINAL_Merged.csv'
-    dosage_file = data_dir / 'Complete_Remedy_Dosage_Dataset.xls'
-
-    # Load datasets
-    training_df = pd.read_csv(balanced_csv)
-    # Symptom columns are all headers except the metadata/label columns
-    symptom_columns = training_df.drop(
-        columns=['SPID', 'Remedy', 'UrgencyScore', 'UrgencyCategory', 'UrgencyCategoryEncoded', 'Condition'],
-        errors='ignore'
-    ).columns.tolist()
-
-    composition_df = pd.read_csv(composition_csv)
-    if 'Remedy' in composition_df.columns:
-        composition_df['Remedy'] = composition_df['Remedy'].astype(str).str.strip().str.upper()
-
-    # Load models
-    clfu = joblib.load(str(model_dir / 'balanced_urgency_classifier.pkl'))
-    reg = joblib.load(str(model_dir / 'urgency_gb_regressor.pkl'))
-    clfr = joblib.load(str(model_dir / 'balanced_remedy_classifier.pkl'))
-
-    # Dosage sheet can be xls/xlsx/csv; try excel first then csv
-    dosage_df = None
-    try:
-        dosage_df = pd.read_excel(dosage_file)
-    except Exception:
-        try:
-            dosage_df = pd.read_csv(dosage_file)
-        except Exception:
-            dosage_df = None
-    if dosage_df is not None:
-        # Normalize columns (strip spaces)
-        dosage_df.columns = [str(c).strip() for c in dosage_df.columns]
-
-    return {
-        'symptom_columns': symptom_columns,
-        'composition_df': composition_df,
-        'dosage_df': dosage_df,
-        'models': {'clf_u': clfu, 'reg': reg, 'clf_r': clfr}
+# Artifact loading and lookup helpers live next to the primary service script
+# (server/pyservice); this file is at server/src/pyservice/predict.py
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'pyservice'))
+from artifacts import load_artifacts  # noqa: E402
+from ensemble import TriagePredictor  # noqa: E402
+from lookups import COMPOSITION_NOT_FOUND, lookup_composition, lookup_dosage  # noqa: E402
+from validation import InputValidator  # noqa: E402
+
+
+CATEGORY_MAP = {1: 'Low', 2: 'Moderate', 3: 'High'}
+
+
+def composition_details(composition_index, remedy_pred):
+    comp_obj = {'Remedy': remedy_pred, 'Source': '', 'Chemical Composition': ''}
+    match = lookup_composition(composition_index, remedy_pred)
+    if match is not COMPOSITION_NOT_FOUND:
+        comp_obj['Source'] = str(match.source) if match.source is not None else ''
+        comp_obj['Chemical Composition'] = str(match.chemical_composition) if match.chemical_composition is not None else ''
+    return comp_obj
+
+
+def dosage_details(dosage_index, remedy_pred, age_cat, gender):
+    dosage_obj = {
+        'Concentration': None,
+        'Dosage': 'Not available',
+        'Timing': None,
+        'Age Category': age_cat,
+        'Gender': 'M' if gender == 'M' else ('F' if gender == 'F' else 'Other')
     }
-
-
-def age_category(age: int) -> str:
-    if age <= 12:
-        return 'Child'
-    if age <= 18:
-        return 'Adolescent'
-    if age <= 60:
-        return 'Adult'
-    return 'Senior'
+    # case-insensitive match on remedy and gender
+    match = lookup_dosage(dosage_index, remedy_pred, age_cat, gender)
+    if match is not None:
+        dosage_obj['Concentration'] = str(match.concentration or '') or None
+        dosage_obj['Dosage'] = str(match.dosage or 'Not available')
+        dosage_obj['Timing'] = str(match.timing or '') or None
+    return dosage_obj
+
+
+def predict_batch(payloads, artifacts=None):
+    """Score a list of payloads with a single predict call per model.
+
+    Results come back in input order; a payload that fails validation gets
+    its own {'error': ...} entry and does not fail the rest of the batch.
+    """
+    if artifacts is None:
+        artifacts = load_artifacts()
+    symptom_columns = artifacts['symptom_columns']
+    models = artifacts['models']
+
+    results = [None] * len(payloads)
+    # Same checks as the primary service; missing symptoms count as 0
+    checked = InputValidator(symptom_columns).validate_batch(payloads)
+    rows = []
+    for i, errors in enumerate(checked.errors):
+        if errors:
+            results[i] = {'error': '; '.join(errors)}
+        else:
+            rows.append(i)
+
+    if rows:
+        predictor = TriagePredictor(models, artifacts['model_columns'])
+        cat_preds, score_preds, remedy_preds = predictor.predict(checked.matrix[rows])
+
+        for j, i in enumerate(rows):
+            age_cat, gender = checked.age_categories[i], checked.genders[i]
+            # Determine if we should fallback (<=1 non-zero symptoms)
+            # Minimal input; still run models for completeness but mark fallback
+            fallback_used = bool(checked.symptom_counts[i] <= 1)
+
+            cat_pred = cat_preds[j]
+            score_pred = float(score_preds[j])
+            remedy_pred = str(remedy_preds[j])
+            urgency_category = CATEGORY_MAP.get(int(cat_pred), str(cat_pred))
+
+            results[i] = {
+                'predicted': {
+                    'UrgencyScore': round(score_pred, 2),
+                    'UrgencyCategory': urgency_category,
+                    'Remedy': remedy_pred
+                },
+                'dosage': dosage_details(artifacts['dosage_index'], remedy_pred, age_cat, gender),
+                'composition': composition_details(artifacts['composition_index'], remedy_pred),
+                'fallbackUsed': fallback_used
+            }
+    return results
 
 
 def main():
     try:
         raw = sys.stdin.read()
         payload = json.loads(raw or '{}')
-        symptoms = payload.get('symptoms', {}) or {}
-        age = int(payload.get('age', 0) or 0)
-        gender = str(payload.get('gender', '') or '').upper()
 
         artifacts = load_artifacts()
-        symptom_columns = artifacts['symptom_columns']
-        composition_df = artifacts['composition_df']
-        dosage_df = artifacts['dosage_df']
-        models = artifacts['models']
-
-        # Build input row with all required columns, defaulting to 0
-        row = {col: int(symptoms.get(col, 0) or 0) for col in symptom_columns}
-        input_df = pd.DataFrame([row])[symptom_columns]
-
-        # Determine if we should fallback (<=1 non-zero symptoms)
-        non_zero_cols = [c for c, v in row.items() if v and v > 0]
-        fallback_used = False
-
-        if len(non_zero_cols) <= 1:
-            # Minimal input; still run models for completeness but mark fallback
-            fallback_used = True
-
-        # Predict
-        cat_pred = models['clf_u'].predict(input_df)[0]
-        score_pred = float(models['reg'].predict(input_df)[0])
-        remedy_pred = str(models['clf_r'].predict(input_df)[0])
-
-        category_map = {1: 'Low', 2: 'Moderate', 3: 'High'}
-        urgency_category = category_map.get(int(cat_pred), str(cat_pred))
-
-        # Composition lookup
-        remedy_key = remedy_pred.strip().upper()
-        comp_obj = {'Remedy': remedy_pred, 'Source': '', 'Chemical Composition': ''}
-        try:
-            match = composition_df[composition_df['Remedy'] == remedy_key]
-            if not match.empty:
-                comp_obj['Source'] = str(match['Source'].iloc[0]) if 'Source' in match.columns else ''
-                comp_obj['Chemical Composition'] = str(match['Chemical Composition'].iloc[0]) if 'Chemical Composition' in match.columns else ''
-        except Exception:
-            pass
-
-        # Dosage lookup
-        age_cat = age_category(age)
-        dosage_obj = {
-            'Concentration': None,
-            'Dosage': 'Not available',
-            'Timing': None,
-            'Age Category': age_cat,
-            'Gender': 'M' if gender == 'M' else ('F' if gender == 'F' else 'Other')
-        }
-        try:
-            if dosage_df is not None and all(col in dosage_df.columns for col in ['Remedy', 'Age Category', 'Gender']):
-                # case-insensitive match on remedy and gender
-                df = dosage_df.copy()
-                df['Remedy'] = df['Remedy'].astype(str)
-                df['Gender'] = df['Gender'].astype(str)
-                match = df[
-                    (df['Remedy'].str.lower() == remedy_pred.lower()) &
-                    (df['Age Category'] == age_cat) &
-                    (df['Gender'].str.upper() == (gender if gender in ('M', 'F') else gender))
-                ]
-                if not match.empty:
-                    row0 = match.iloc[0]
-                    dosage_obj['Concentration'] = str(row0.get('Concentration') or '') or None
-                    dosage_obj['Dosage'] = str(row0.get('Dosage') or 'Not available')
-                    dosage_obj['Timing'] = str(row0.get('Timing') or '') or None
-        except Exception:
-            pass
-
-        result = {
-            'predicted': {
-                'UrgencyScore': round(score_pred, 2),
-                'UrgencyCategory': urgency_category,
-                'Remedy': remedy_pred
-            },
-            'dosage': dosage_obj,
-            'composition': comp_obj,
-            'fallbackUsed': fallback_used
-        }
+        # A JSON array is scored as one batch
+        if isinstance(payload, list):
+            result = predict_batch(payload, artifacts)
+        else:
+            result = predict_batch([payload], artifacts)[0]
 
         sys.stdout.write(json.dumps(result))
         sys.stdout.flush()
@@ -54,7 +54,7 @@ triageRouter.post('/', async (req, res) => {
     return res.status(400).json({ error: `Invalid symptoms: ${JSON.stringify(unknown)}. Valid: ${JSON.stringify(CANONICAL_SYMPTOMS)}` });
   }
   try {
-    const { predicted, dosage, composition, explanation, fallbackUsed } = await scoreTriage({ symptoms: finalSymptoms, age, gender });
+    const { predicted, dosage, composition, explanation, fallbackUsed, modelVersion, timings } = await scoreTriage({ symptoms: finalSymptoms, age, gender });
     const ageCategory = getAgeCategory(age); // Helper function
     let log = null;
     try {
@@ -77,6 +77,8 @@ triageRouter.post('/', async (req, res) => {
         composition,
         explanation: explanation || undefined,
         fallbackUsed,
+        modelVersion,
+        timings,
         notes,
         emotion
       });
@@ -89,7 +91,7 @@ triageRouter.post('/', async (req, res) => {
       const errMsg = dbError instanceof Error ? dbError.message : String(dbError);
       console.log('DB save failed, continuing without logging:', errMsg);
     }
-    res.json({ predicted, dosage, composition, explanation: explanation || null, fallbackUsed, logId: log?._id || null });
+    res.json({ predicted, dosage, composition, explanation: explanation || null, fallbackUsed, modelVersion: modelVersion || null, logId: log?._id || null });
   } catch (error) {
     const msg = error instanceof Error ? error.message : String(error);
     res.status(500).json({ error: msg });
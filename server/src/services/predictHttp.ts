@@ -0,0 +1,72 @@
+import http from 'http';
+
+export type PredictHttpOptions = {
+  url: string;
+  timeoutMs: number;
+  maxSockets: number;
+};
+
+/**
+ * Client for `predict.py --http`. Connections are kept alive and reused, so a
+ * request costs one round trip instead of a process spawn.
+ */
+export class PredictHttpClient {
+  private agent: http.Agent;
+  private base: URL;
+
+  constructor(private options: PredictHttpOptions) {
+    this.base = new URL(options.url);
+    this.agent = new http.Agent({ keepAlive: true, maxSockets: options.maxSockets });
+  }
+
+  request(method: 'GET' | 'POST', path: string, payload?: unknown): Promise<any> {
+    const url = new URL(path, this.base);
+    const body = payload === undefined ? undefined : JSON.stringify(payload);
+    return new Promise((resolve, reject) => {
+      const req = http.request(url, {
+        method,
+        agent: this.agent,
+        timeout: this.options.timeoutMs,
+        headers: body === undefined
+          ? {}
+          : { 'Content-Type': 'application/json', 'Content-Length': Buffer.byteLength(body) }
+      }, (res) => {
+        let data = '';
+        res.setEncoding('utf8');
+        res.on('data', (chunk) => { data += chunk; });
+        res.on('end', () => {
+          // Validation failures come back as 400 with an `error` body, which
+          // callers handle like the stdin/stdout result
+          try {
+            resolve(JSON.parse(data));
+          } catch {
+            reject(new Error(`Prediction service returned ${res.statusCode}: ${data.slice(0, 200)}`));
+          }
+        });
+      });
+      req.on('timeout', () => req.destroy(new Error(`Prediction service timed out after ${this.options.timeoutMs}ms`)));
+      req.on('error', reject);
+      if (body !== undefined) req.write(body);
+      req.end();
+    });
+  }
+
+  predict(input: Record<string, any>, timings = false): Promise<any> {
+    return this.request('POST', timings ? '/predict?timings=1' : '/predict', input);
+  }
+
+  // One result per input, in order; invalid rows carry their own `error`
+  async predictBatch(inputs: Record<string, any>[]): Promise<any[]> {
+    const reply = await this.request('POST', '/predict/batch', inputs);
+    if (reply.error) throw new Error(reply.error);
+    return reply.results;
+  }
+
+  health(): Promise<any> {
+    return this.request('GET', '/health');
+  }
+
+  close() {
+    this.agent.destroy();
+  }
+}
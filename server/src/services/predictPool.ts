@@ -0,0 +1,253 @@
+import { spawn } from 'child_process';
+import type { ChildProcessWithoutNullStreams } from 'child_process';
+import { createRequire } from 'module';
+import readline from 'readline';
+
+type Pending = {
+  resolve: (value: any) => void;
+  reject: (reason: Error) => void;
+  timer: NodeJS.Timeout;
+};
+
+export type PredictPoolOptions = {
+  script: string;
+  python: string;
+  size: number;
+  timeoutMs: number;
+  healthIntervalMs: number;
+  // 'msgpack' sends length-prefixed msgpack frames instead of JSON lines
+  framing?: 'json' | 'msgpack';
+};
+
+type MsgpackCodec = {
+  encode: (value: unknown) => Uint8Array;
+  decode: (data: Uint8Array) => unknown;
+};
+
+const requireOptional = createRequire(import.meta.url);
+let msgpackCodec: MsgpackCodec | null | undefined;
+
+// @msgpack/msgpack is not a declared dependency (npm install it to use
+// msgpack framing); without it workers use JSON
+function loadMsgpack(): MsgpackCodec | null {
+  if (msgpackCodec === undefined) {
+    try {
+      msgpackCodec = requireOptional('@msgpack/msgpack') as MsgpackCodec;
+    } catch {
+      console.warn('PREDICT_FRAMING=msgpack needs @msgpack/msgpack; using JSON lines');
+      msgpackCodec = null;
+    }
+  }
+  return msgpackCodec;
+}
+
+/**
+ * One long-lived `predict.py --worker` process. Requests and replies are
+ * line-delimited JSON (or length-prefixed msgpack) matched up by id.
+ */
+class PredictWorker {
+  private proc: ChildProcessWithoutNullStreams;
+  private pending = new Map<number, Pending>();
+  private nextId = 1;
+  private stderrTail = '';
+  private codec: MsgpackCodec | null;
+  // Includes requests still waiting for startup, so the pool spreads them out
+  load = 0;
+  alive = true;
+  ready: Promise<void>;
+
+  constructor(private options: PredictPoolOptions, onExit: (worker: PredictWorker) => void) {
+    this.codec = options.framing === 'msgpack' ? loadMsgpack() : null;
+    const args = [options.script, '--worker'];
+    if (this.codec) args.push('--framing', 'msgpack');
+    this.proc = spawn(options.python, args, { stdio: ['pipe', 'pipe', 'pipe'] });
+
+    let markReady: () => void = () => {};
+    let markFailed: (err: Error) => void = () => {};
+    this.ready = new Promise<void>((resolve, reject) => {
+      markReady = resolve;
+      markFailed = reject;
+    });
+    // Avoid unhandled rejections when nobody is waiting on startup
+    this.ready.catch(() => {});
+
+    const onMessage = (msg: any) => {
+      if (msg.ready) {
+        markReady();
+        return;
+      }
+      const entry = this.pending.get(msg.id);
+      if (!entry) return;
+      this.pending.delete(msg.id);
+      clearTimeout(entry.timer);
+      if (msg.error) entry.reject(new Error(msg.error));
+      else entry.resolve(msg);
+    };
+
+    if (this.codec) {
+      const codec = this.codec;
+      // 4-byte big-endian length, then that many bytes of msgpack
+      let buffered = Buffer.alloc(0);
+      this.proc.stdout.on('data', (chunk: Buffer) => {
+        buffered = buffered.length ? Buffer.concat([buffered, chunk]) : chunk;
+        while (buffered.length >= 4) {
+          const length = buffered.readUInt32BE(0);
+          if (buffered.length < 4 + length) break;
+          const payload = buffered.subarray(4, 4 + length);
+          buffered = buffered.subarray(4 + length);
+          let msg: any;
+          try {
+            msg = codec.decode(payload);
+          } catch {
+            continue;
+          }
+          onMessage(msg);
+        }
+      });
+    } else {
+      const lines = readline.createInterface({ input: this.proc.stdout });
+      lines.on('line', (line) => {
+        let msg: any;
+        try {
+          msg = JSON.parse(line);
+        } catch {
+          return;
+        }
+        onMessage(msg);
+      });
+    }
+
+    this.proc.stderr.on('data', (data) => {
+      this.stderrTail = (this.stderrTail + data.toString()).slice(-2000);
+    });
+
+    const fail = (reason: string) => {
+      if (!this.alive) return;
+      this.alive = false;
+      const err = new Error(`Python worker exited: ${reason}${this.stderrTail ? `\n${this.stderrTail}` : ''}`);
+      markFailed(err);
+      for (const entry of this.pending.values()) {
+        clearTimeout(entry.timer);
+        entry.reject(err);
+      }
+      this.pending.clear();
+      onExit(this);
+    };
+    this.proc.on('exit', (code, signal) => fail(signal ? `signal ${signal}` : `code ${code}`));
+    this.proc.on('error', (err) => fail(err.message));
+    // A write after the worker died (before 'exit' arrives) fails with EPIPE;
+    // without a listener that error would take down the whole server
+    this.proc.stdin.on('error', (err) => fail(`stdin ${err.message}`));
+  }
+
+  async request(message: Record<string, any>, timeoutMs = this.options.timeoutMs): Promise<any> {
+    this.load++;
+    try {
+      await this.ready;
+      if (!this.alive) throw new Error('Python worker is not running');
+      return await this.send(message, timeoutMs);
+    } finally {
+      this.load--;
+    }
+  }
+
+  private send(message: Record<string, any>, timeoutMs: number): Promise<any> {
+    if (!this.alive || !this.proc.stdin.writable) {
+      return Promise.reject(new Error('Python worker is not running'));
+    }
+    const id = this.nextId++;
+    return new Promise((resolve, reject) => {
+      const timer = setTimeout(() => {
+        this.pending.delete(id);
+        reject(new Error(`Python worker timed out after ${timeoutMs}ms`));
+      }, timeoutMs);
+      this.pending.set(id, { resolve, reject, timer });
+      this.proc.stdin.write(this.encode({ ...message, id }));
+    });
+  }
+
+  private encode(message: Record<string, any>): string | Buffer {
+    if (!this.codec) return JSON.stringify(message) + '\n';
+    const payload = this.codec.encode(message);
+    const header = Buffer.alloc(4);
+    header.writeUInt32BE(payload.length, 0);
+    return Buffer.concat([header, payload]);
+  }
+
+  kill() {
+    this.proc.kill();
+  }
+}
+
+/**
+ * Small pool of warm prediction workers. Artifacts are loaded once per worker
+ * instead of once per request; crashed or unresponsive workers are replaced.
+ */
+export class PredictPool {
+  private workers: PredictWorker[] = [];
+  private healthTimer: NodeJS.Timeout | null = null;
+  private closed = false;
+
+  constructor(private options: PredictPoolOptions) {}
+
+  private spawnWorker(): PredictWorker {
+    const worker = new PredictWorker(this.options, (dead) => this.replace(dead));
+    this.workers.push(worker);
+    return worker;
+  }
+
+  private replace(dead: PredictWorker) {
+    this.workers = this.workers.filter(w => w !== dead);
+    if (this.closed) return;
+    // Back off briefly so a broken install does not respawn in a tight loop
+    setTimeout(() => {
+      if (!this.closed && this.workers.length < this.options.size) this.spawnWorker();
+    }, 500).unref();
+  }
+
+  private start() {
+    while (this.workers.length < this.options.size) this.spawnWorker();
+    if (!this.healthTimer && this.options.healthIntervalMs > 0) {
+      this.healthTimer = setInterval(() => this.checkHealth(), this.options.healthIntervalMs);
+      this.healthTimer.unref();
+    }
+  }
+
+  private checkHealth() {
+    for (const worker of this.workers) {
+      worker.request({ op: 'ping' }, this.options.healthIntervalMs).catch(() => {
+        // The exit handler takes care of respawning
+        worker.kill();
+      });
+    }
+  }
+
+  async request(message: Record<string, any>): Promise<any> {
+    if (this.closed) throw new Error('Prediction pool is closed');
+    this.start();
+    // Least-loaded live worker; ties go to the earliest spawned
+    const live = this.workers.filter(w => w.alive);
+    if (!live.length) throw new Error('No Python workers available');
+    const worker = live.reduce((best, w) => (w.load < best.load ? w : best));
+    return worker.request(message);
+  }
+
+  // With timings, the result carries a per-phase `timings` block (ms)
+  async predict(input: Record<string, any>, timings = false): Promise<any> {
+    const reply = await this.request({ op: 'predict', input, timings });
+    return reply.result;
+  }
+
+  // One result per input, in order; invalid rows carry their own `error`
+  async predictBatch(inputs: Record<string, any>[]): Promise<any[]> {
+    const reply = await this.request({ op: 'predict_batch', inputs });
+    return reply.results;
+  }
+
+  close() {
+    this.closed = true;
+    if (this.healthTimer) clearInterval(this.healthTimer);
+    for (const worker of this.workers) worker.kill();
+    this.workers = [];
+  }
+}
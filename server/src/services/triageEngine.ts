@@ -2,6 +2,9 @@ import { spawn } from 'child_process';
 import { fileURLToPath } from 'url';
 import { dirname, join } from 'path';
 import { explanationService } from './explanationService';
+import { PredictPool } from './predictPool';
+import { PredictHttpClient } from './predictHttp';
+import { env } from '../env';
 
 const __filename = fileURLToPath(import.meta.url);
 const __dirname = dirname(__filename);
@@ -32,11 +35,41 @@ export type TriageOutput = {
   };
   explanation?: string | null;
   fallbackUsed: boolean;
+  // Content version of the model files that produced this result
+  modelVersion?: string;
+  // Per-phase milliseconds from predict.py plus the Node-side round trip;
+  // only present when PREDICT_TIMINGS=1
+  timings?: Record<string, any>;
 };
 
-export async function scoreTriage(input: TriageInput): Promise<TriageOutput> {
+const PREDICT_SCRIPT = join(__dirname, '../../pyservice/predict.py');
+
+// Prediction backends, in order of preference: an HTTP service shared by all
+// Node processes, a pool of warm stdin/stdout workers, or one process per call
+const predictHttp = env.PREDICT_URL
+  ? new PredictHttpClient({
+      url: env.PREDICT_URL,
+      timeoutMs: env.PREDICT_TIMEOUT_MS,
+      maxSockets: 16
+    })
+  : null;
+
+const predictPool = !predictHttp && env.PREDICT_WORKERS > 0
+  ? new PredictPool({
+      script: PREDICT_SCRIPT,
+      python: env.PYTHON_BIN,
+      size: env.PREDICT_WORKERS,
+      timeoutMs: env.PREDICT_TIMEOUT_MS,
+      healthIntervalMs: env.PREDICT_HEALTH_INTERVAL_MS,
+      framing: env.PREDICT_FRAMING
+    })
+  : null;
+
+// One-shot mode: a fresh Python process per request
+function runPredictOnce(input: TriageInput): Promise<any> {
   return new Promise((resolve, reject) => {
-    const pythonProcess = spawn('python', [join(__dirname, '../../pyservice/predict.py')], {
+    const args = env.PREDICT_TIMINGS ? [PREDICT_SCRIPT, '--timings'] : [PREDICT_SCRIPT];
+    const pythonProcess = spawn(env.PYTHON_BIN, args, {
       stdio: ['pipe', 'pipe', 'pipe']
     });
 
@@ -51,38 +84,15 @@ export async function scoreTriage(input: TriageInput): Promise<TriageOutput> {
       errorOutput += data.toString();
     });
 
-    pythonProcess.on('close', async (code) => {
+    pythonProcess.on('close', (code) => {
       if (code !== 0) {
         reject(new Error(`Python process failed: ${errorOutput}`));
-      } else {
-        try {
-          const result = JSON.parse(output);
-          if (result.error) {
-            reject(new Error(result.error));
-          } else {
-            // Generate explanation using AI (best-effort)
-            let explanation: string | null = null;
-            try {
-              explanation = await explanationService.generateExplanation(
-                input.symptoms,
-                result.predicted?.UrgencyScore ?? 0,
-                result.predicted?.UrgencyCategory ?? 'Unknown',
-                result.predicted?.Remedy ?? '—',
-                result.dosage
-              );
-            } catch {
-              explanation = null;
-            }
-
-            // Add explanation to the result (optional field)
-            resolve({
-              ...result,
-              explanation
-            });
-          }
-        } catch (e) {
-          reject(new Error(`Failed to parse Python output: ${output}`));
-        }
+        return;
+      }
+      try {
+        resolve(JSON.parse(output));
+      } catch (e) {
+        reject(new Error(`Failed to parse Python output: ${output}`));
       }
     });
 
@@ -90,3 +100,39 @@ export async function scoreTriage(input: TriageInput): Promise<TriageOutput> {
     pythonProcess.stdin.end();
   });
 }
+
+export async function scoreTriage(input: TriageInput): Promise<TriageOutput> {
+  const started = performance.now();
+  const result = predictHttp
+    ? await predictHttp.predict(input, env.PREDICT_TIMINGS)
+    : predictPool
+      ? await predictPool.predict(input, env.PREDICT_TIMINGS)
+      : await runPredictOnce(input);
+  if (result.error) {
+    throw new Error(result.error);
+  }
+  if (result.timings) {
+    // Round trip minus Python's total is spawn/IPC (and startup in one-shot mode)
+    result.timings.roundtrip = Math.round((performance.now() - started) * 1000) / 1000;
+  }
+
+  // Generate explanation using AI (best-effort)
+  let explanation: string | null = null;
+  try {
+    explanation = await explanationService.generateExplanation(
+      input.symptoms,
+      result.predicted?.UrgencyScore ?? 0,
+      result.predicted?.UrgencyCategory ?? 'Unknown',
+      result.predicted?.Remedy ?? '—',
+      result.dosage
+    );
+  } catch {
+    explanation = null;
+  }
+
+  // Add explanation to the result (optional field)
+  return {
+    ...result,
+    explanation
+  };
+}